@@ -0,0 +1,333 @@
+"""Declarative controllers: membership functions and rules from a config file.
+
+A config names the input variables with their trapezoidal terms, the output
+variable and the rules (see DEFAULT_CONFIG, which is the FuzzyLogic
+controller). compile_config() turns it into a CompiledController whose
+evaluate_batch() runs the same array code as FuzzyLogic.evaluate_batch, so a
+different crop only needs a different file:
+
+    controller = load_controller('configs/succulent.toml')
+    result = controller.evaluate_batch(temperatures, soil_moistures, light_intensities)
+
+    python -m algorithm.controller_config --dump default.json
+
+Configs are read from JSON, TOML (tomllib, or tomli before Python 3.11) or
+YAML (PyYAML), and compiled controllers are cached by config hash.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import types
+
+import numpy as np
+
+from algorithm import defuzzification, kernel
+
+
+def _default_config():
+    inputs = [
+        {'name': 'temperature', 'unit': '°C', 'universe': [-20, 50],
+         'terms': {'very_cold': [-20, -20, 5, 10], 'cold': [5, 10, 15, 20],
+                   'warm': [15, 20, 25, 30], 'hot': [25, 30, 50, 50]}},
+        {'name': 'soil_moisture', 'unit': '%', 'universe': [0, 100],
+         'terms': {'very_dry': [0, 0, 25, 35], 'dry': [25, 35, 45, 55],
+                   'moist': [45, 55, 65, 75], 'very_moist': [65, 75, 100, 100]}},
+        {'name': 'light_intensity', 'unit': 'µmol/m²/s', 'universe': [0, 1000],
+         'terms': {'weak': [0, 0, 300, 400], 'medium': [300, 400, 700, 800],
+                   'strong': [700, 800, 1000, 1000]}}
+    ]
+    output = {'name': 'watering_speed', 'unit': 'liters/minute', 'universe': [0, 12],
+              'terms': {'very_slow': [0, 0, 2, 3], 'slow': [2, 3, 5, 6],
+                        'fast': [5, 6, 8, 9], 'very_fast': [8, 9, 12, 12]}}
+    # 'ijk': consequent, the term indices of temperature, soil moisture and
+    # light intensity and the index of the watering speed term they conclude
+    rules_set = {
+        '002': 0,        '100': 2,        '101': 2,
+        '102': 3,        '110': 1,        '111': 1,
+        '112': 2,        '121': 0,        '122': 1,
+        '200': 3,        '201': 3,        '202': 3,
+        '210': 2,        '211': 2,        '212': 3,
+        '220': 1,        '221': 1,        '222': 2,
+        '300': 3,        '301': 3,        '302': 3,
+        '310': 2,        '311': 2,        '312': 3,
+        '320': 1,        '321': 2,        '322': 2
+    }
+    names = [list(variable['terms']) for variable in inputs]
+    rules = [{'if': [names[i][int(term)] for i, term in enumerate(combination)],
+              'then': list(output['terms'])[consequent]}
+             for combination, consequent in sorted(rules_set.items())]
+    return {'inputs': inputs, 'output': output, 'rules': rules}
+
+
+# The controller every engine is built from: FuzzyLogic, the visualizer and
+# skfuzzy specs and the lookup table all read their terms, universes and
+# rules from here. A term [a, b, c, d] rises from a to b and falls from c to
+# d; a == b on the first term or c == d on the last one makes it a shoulder
+# that stays 1 beyond the universe.
+DEFAULT_CONFIG = _default_config()
+
+
+def compile_rules_set(rules_set, shape, n_consequents):
+    """Turn a {(i, j, k): consequent} or {'ijk': consequent} rule dict into dense index arrays.
+
+    Returns (consequents, mask, consequent_masks): consequents[i, j, k] holds
+    the consequent term of rule 'ijk' (-1 where there is no rule), mask flags
+    the valid rules and consequent_masks[q] flattens the rules concluding q.
+    """
+    consequents = np.full(shape, -1, dtype=np.intp)
+    for combination, consequent in rules_set.items():
+        consequents[tuple(int(i) for i in combination)] = consequent
+    mask = consequents >= 0
+    consequent_masks = consequents.ravel() == np.arange(n_consequents)[:, np.newaxis]
+    for array in (consequents, mask, consequent_masks):
+        array.setflags(write=False)
+    return consequents, mask, consequent_masks
+
+
+def partition_breakpoints(terms, name='input'):
+    """Sorted breakpoints of terms that overlap only with their neighbours.
+
+    Each term must rise on the ramp where the previous one falls, the first
+    and last terms must be shoulders and every ramp must have a width, so the
+    breakpoints are c, d of every term but the last. Raises ValueError for
+    other layouts, where more than two terms can be non-zero at once.
+    """
+    terms = np.asarray(terms, dtype=float)
+    last = terms.shape[0] - 1
+    if terms[0, 0] != terms[0, 1] or terms[last, 2] != terms[last, 3]:
+        raise ValueError("The first and last terms of '{}' must be shoulders".format(name))
+    for q in range(last):
+        if (terms[q + 1, 0], terms[q + 1, 1]) != (terms[q, 2], terms[q, 3]) or terms[q, 3] <= terms[q, 2]:
+            raise ValueError("Term {} of '{}' must rise on the ramp where term {} falls".format(q + 1, name, q))
+    return tuple(terms[:last, 2:].ravel().tolist())
+
+
+def config_hash(config):
+    """Stable digest of a controller config, used as its cache key."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_config(path):
+    """Read a config from a .json, .toml or .yaml/.yml file."""
+    if path.endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:
+            import tomli as tomllib
+        with open(path, 'rb') as file:
+            return tomllib.load(file)
+    with open(path, encoding='utf-8') as file:
+        if path.endswith('.yaml') or path.endswith('.yml'):
+            import yaml
+            return yaml.safe_load(file)
+        return json.load(file)
+
+
+def _compile_terms(variable):
+    if not variable.get('terms'):
+        raise ValueError("Variable '{}' has no terms".format(variable.get('name')))
+    terms = []
+    for name, abcd in variable['terms'].items():
+        if len(abcd) != 4 or not all(abcd[i] <= abcd[i + 1] for i in range(3)):
+            raise ValueError("Term '{}' of '{}' must be [a, b, c, d] with a <= b <= c <= d".format(
+                name, variable['name']))
+        terms.append(abcd)
+    terms = np.array(terms, dtype=float)
+    terms.setflags(write=False)
+    return tuple(variable['terms']), terms
+
+
+class CompiledController(object):
+    """A config compiled into term arrays and a rule tensor.
+
+    evaluate_batch() takes one array per input, in config order, and returns
+    the same dict as FuzzyLogic.evaluate_batch with membership_values_of_<name>
+    keys for the config's variables. With DEFAULT_CONFIG every value is
+    identical to FuzzyLogic's.
+
+    A compiled controller is immutable (read-only arrays, no attribute
+    assignment, a private copy of the config) and evaluate_batch keeps no
+    state, so one instance can serve any number of threads.
+    """
+
+    def __init__(self, config):
+        if not config.get('inputs') or 'output' not in config or 'rules' not in config:
+            raise ValueError("A config needs 'inputs', 'output' and 'rules'")
+        config = json.loads(json.dumps(config))
+        self.config = config
+        self.input_names = tuple(variable['name'] for variable in config['inputs'])
+        self.output_name = config['output']['name']
+        compiled = [_compile_terms(variable) for variable in config['inputs']]
+        self.input_term_names = tuple(names for names, terms in compiled)
+        self.input_terms = tuple(terms for names, terms in compiled)
+        self.output_term_names, self.output_terms = _compile_terms(config['output'])
+
+        rules_set = {}
+        for rule in config['rules']:
+            if len(rule['if']) != len(self.input_names):
+                raise ValueError("Rule {} needs one term per input".format(rule))
+            try:
+                key = tuple(names.index(term) for names, term in zip(self.input_term_names, rule['if']))
+                consequent = self.output_term_names.index(rule['then'])
+            except ValueError:
+                raise ValueError("Rule {} uses an unknown term".format(rule))
+            if rules_set.get(key, consequent) != consequent:
+                raise ValueError("Rules for {} conclude different terms".format(rule['if']))
+            rules_set[key] = consequent
+        self.rule_consequents, self.rule_mask, self.consequent_masks = compile_rules_set(
+            rules_set, tuple(len(names) for names in self.input_term_names), len(self.output_term_names))
+        self.rules = types.MappingProxyType(rules_set)
+        self.hash = config_hash(config)
+
+        # The same terms and rules as flat arrays for the fused kernel, rules
+        # in the order the NumPy path fires them
+        self.term_counts = np.array([terms.shape[0] for terms in self.input_terms], dtype=np.intp)
+        self.padded_terms = np.zeros((len(self.input_terms), self.term_counts.max(), 4))
+        for i, terms in enumerate(self.input_terms):
+            self.padded_terms[i, :terms.shape[0]] = terms
+        self.padded_ramps = kernel.ramp_coefficients(self.padded_terms)
+        self.rule_terms = np.array(np.nonzero(self.rule_mask), dtype=np.intp).T.copy()
+        self.rule_outputs = self.rule_consequents[self.rule_mask].astype(np.intp)
+        a, b, c, d = self.output_terms.T
+        self.ordered_outputs = all((np.diff(edge) >= 0).all() for edge in (a, b, c, d))
+        for array in (self.term_counts, self.padded_terms, self.padded_ramps, self.rule_terms, self.rule_outputs):
+            array.setflags(write=False)
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("CompiledController is immutable; compile a new config instead")
+        object.__setattr__(self, name, value)
+
+    def evaluate_batch(self, *inputs, defuzzification_method='average_maximum', use_numba=False):
+        """Evaluate one array per input; see the class docstring.
+
+        Both paths release the GIL while they work on the arrays: the NumPy
+        one inside each ufunc, the fused kernel of algorithm/kernel.py
+        (use_numba=True, needs Numba; None uses it when installed) for the
+        whole batch. Results are identical; benchmarks/threads.py tells which
+        is faster on a given machine.
+        """
+        if len(inputs) != len(self.input_names):
+            raise ValueError("Expected {} input arrays ({})".format(len(self.input_names), ', '.join(self.input_names)))
+        inputs = [np.asarray(values, dtype=float).ravel() for values in inputs]
+        rows = inputs[0].shape[0]
+        if any(values.shape[0] != rows for values in inputs):
+            raise ValueError("{} must have the same length".format(', '.join(self.input_names)))
+
+        fused = kernel.numba_kernel() if use_numba is not False else None
+        if use_numba and fused is None:
+            raise ImportError("use_numba=True needs Numba installed")
+        if fused is not None:
+            memberships, mu_output, max1, max2 = self._evaluate_fused(fused, inputs, rows)
+        else:
+            memberships, mu_output = self._infer(inputs, rows)
+            max1, max2 = defuzzification.extremes_of_maximum(mu_output, self.output_terms)
+        if defuzzification_method == 'average_maximum':
+            crisp_value = (max1 + max2) / 2
+        else:
+            crisp_value = defuzzification.defuzzify_batch(mu_output, self.output_terms, defuzzification_method)
+        result = {'membership_values_of_' + name: values for name, values in zip(self.input_names, memberships)}
+        result.update({
+            'membership_values_of_' + self.output_name: mu_output,
+            'rule_fired': mu_output.max(axis=1) > 0,
+            'max1': max1,
+            'max2': max2,
+            'crisp_value': crisp_value,
+            'output': crisp_value / 60000
+        })
+        return result
+
+    def _evaluate_fused(self, fused, inputs, rows):
+        memberships = np.empty((len(inputs), self.padded_terms.shape[1], rows))
+        mu_output = np.empty((self.output_terms.shape[0], rows))
+        max1, max2 = np.empty(rows), np.empty(rows)
+        fused(np.stack(inputs), self.padded_terms, self.padded_ramps, self.term_counts, self.rule_terms, self.rule_outputs,
+              self.output_terms, self.ordered_outputs, memberships, mu_output, max1, max2)
+        # Same column-major (rows, terms) layout as the NumPy path
+        return ([memberships[i, :count].T for i, count in enumerate(self.term_counts.tolist())],
+                mu_output.T, max1, max2)
+
+    def _infer(self, inputs, rows):
+        memberships = [self._fuzzify(values, terms) for values, terms in zip(inputs, self.input_terms)]
+
+        # Fuzzy inference: min for AND, max to aggregate rules sharing a consequent
+        mu_output = np.zeros((self.output_terms.shape[0], rows)).T
+        strength = np.empty(rows)
+        for key in zip(*np.nonzero(self.rule_mask)):
+            consequent = self.rule_consequents[key]
+            if len(key) == 1:
+                strength[:] = memberships[0][:, key[0]]
+            else:
+                np.minimum(memberships[0][:, key[0]], memberships[1][:, key[1]], out=strength)
+            for i in range(2, len(key)):
+                np.minimum(strength, memberships[i][:, key[i]], out=strength)
+            np.maximum(mu_output[:, consequent], strength, out=mu_output[:, consequent])
+        return memberships, mu_output
+
+    @staticmethod
+    def _fuzzify(values, terms):
+        # Same clipped straight lines as FuzzyLogic._fuzzify_batch, one pair of
+        # edges per trapezoid, column-major so every term is a contiguous column
+        memberships = np.ones((terms.shape[0], values.shape[0]))
+        edge = np.empty(values.shape[0])
+        last = terms.shape[0] - 1
+        for q, (a, b, c, d) in enumerate(terms):
+            if b > a:
+                np.multiply(values, 1 / (b - a), out=edge)
+                edge -= a / (b - a)
+                np.clip(edge, 0, 1, out=edge)
+                np.minimum(memberships[q], edge, out=memberships[q])
+            elif q > 0:
+                memberships[q][values < a] = 0
+            if d > c:
+                np.multiply(values, -1 / (d - c), out=edge)
+                edge += d / (d - c)
+                np.clip(edge, 0, 1, out=edge)
+                np.minimum(memberships[q], edge, out=memberships[q])
+            elif q < last:
+                memberships[q][values > d] = 0
+        # NaN readings take the last term, like FuzzyLogic
+        nan = np.isnan(values)
+        if nan.any():
+            memberships[:, nan] = 0
+            memberships[-1, nan] = 1
+        return memberships.T
+
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def compile_config(config=None):
+    """Process-wide CompiledController for a config, cached by its hash."""
+    config = config if config is not None else DEFAULT_CONFIG
+    key = config_hash(config)
+    with _compiled_lock:
+        if key not in _compiled:
+            _compiled[key] = CompiledController(config)
+        return _compiled[key]
+
+
+def load_controller(path):
+    return compile_config(load_config(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or write controller configs")
+    parser.add_argument('configs', nargs='*', help="config files to compile")
+    parser.add_argument('--dump', metavar='PATH', help="write DEFAULT_CONFIG as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    if args.dump:
+        with open(args.dump, 'w', encoding='utf-8') as file:
+            json.dump(DEFAULT_CONFIG, file, indent=2, ensure_ascii=False)
+    for path in args.configs:
+        controller = load_controller(path)
+        print("{}: {} inputs, {} rules, hash {}".format(path, len(controller.input_names),
+                                                        len(controller.rules), controller.hash[:12]))
+
+
+if __name__ == '__main__':
+    main()
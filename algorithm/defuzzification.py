@@ -0,0 +1,172 @@
+import numpy as np
+
+# All methods work on the Mamdani output set: every output term is a trapezoid
+# (a, b, c, d) clipped at its fuzzy value, and the clipped terms are combined
+# with max. That set is piecewise linear, so every method below is computed
+# exactly from its breakpoints instead of by sampling a universe.
+METHODS = ('centroid', 'bisector', 'mom', 'som', 'lom', 'average_maximum')
+
+
+def defuzzify(memberships, terms, method):
+    """Defuzzify one vector of output memberships; see defuzzify_batch()."""
+    memberships = np.asarray(memberships, dtype=float)
+    return defuzzify_batch(memberships[np.newaxis, :], terms, method)[0]
+
+
+def defuzzify_batch(memberships, terms, method, chunk_size=4096):
+    """Defuzzify an (n, len(terms)) array of output memberships row by row.
+
+    method is one of METHODS: 'centroid' and 'bisector' split the area of the
+    output set, 'som' and 'lom' are the smallest and largest points of its
+    maximum, 'mom' is the mean over that maximum and 'average_maximum' is the
+    midpoint between 'som' and 'lom'. Rows where no term is active give NaN for
+    'centroid' and 'bisector' since the output set has no area.
+    """
+    if method not in METHODS:
+        raise ValueError("Unknown defuzzification method '{}', expected one of {}".format(method, METHODS))
+    memberships = np.asarray(memberships, dtype=float)
+    terms = np.asarray(terms, dtype=float)
+    if memberships.ndim != 2 or memberships.shape[1] != terms.shape[0]:
+        raise ValueError("memberships must have shape (n, {})".format(terms.shape[0]))
+
+    if method in ('som', 'lom', 'average_maximum'):
+        som, lom = extremes_of_maximum(memberships, terms)
+        if method == 'som':
+            return som
+        if method == 'lom':
+            return lom
+        return (som + lom) / 2
+
+    result = np.empty(memberships.shape[0])
+    function = {'centroid': _centroid, 'bisector': _bisector, 'mom': _mean_of_maximum}[method]
+    # The breakpoint arrays are a few dozen columns wide; small chunks keep them in cache
+    for start in range(0, memberships.shape[0], chunk_size):
+        result[start:start + chunk_size] = function(memberships[start:start + chunk_size], terms)
+    return result
+
+
+def extremes_of_maximum(memberships, terms):
+    """Smallest and largest points where the output set reaches its height."""
+    a, b, c, d = terms.T
+    height = memberships.max(axis=1)
+    active = memberships == height[:, np.newaxis]
+    if all((np.diff(edge) >= 0).all() for edge in (a, b, c, d)):
+        # Terms ordered left to right: the first and last active terms hold the extremes
+        first = active.argmax(axis=1)
+        last = terms.shape[0] - 1 - active[:, ::-1].argmax(axis=1)
+        return a[first] + height * (b - a)[first], d[last] - height * (d - c)[last]
+    left = a + height[:, np.newaxis] * (b - a)
+    right = d - height[:, np.newaxis] * (d - c)
+    som = np.where(active, left, np.inf).min(axis=1)
+    lom = np.where(active, right, -np.inf).max(axis=1)
+    return som, lom
+
+
+def _levels_at_height(memberships, terms):
+    # Interval of each term where it reaches the highest fuzzy value
+    a, b, c, d = terms.T
+    height = memberships.max(axis=1)
+    left = a + height[:, np.newaxis] * (b - a)
+    right = d - height[:, np.newaxis] * (d - c)
+    return height, left, right
+
+
+def _row_sum(values):
+    # Column by column, left to right: NumPy's sum(axis=1) picks its order
+    # from the memory layout and row count, which changes the last bit between
+    # a reading defuzzified alone, in a batch or in another chunk
+    total = np.zeros(values.shape[0])
+    for column in values.T:
+        total += column
+    return total
+
+
+def _mean_of_maximum(memberships, terms):
+    height, left, right = _levels_at_height(memberships, terms)
+    active = memberships == height[:, np.newaxis]
+    som = np.where(active, left, np.inf).min(axis=1)
+    # Inactive terms collapse to an empty interval at som so they cover nothing
+    left = np.where(active, left, som[:, np.newaxis])
+    right = np.where(active, right, som[:, np.newaxis])
+    endpoints = np.sort(np.concatenate([left, right], axis=1), axis=1)
+    lengths = np.diff(endpoints, axis=1)
+    middles = (endpoints[:, 1:] + endpoints[:, :-1]) / 2
+    covered = np.zeros(lengths.shape, dtype=bool)
+    for q in range(terms.shape[0]):
+        covered |= (left[:, q, np.newaxis] <= middles) & (middles <= right[:, q, np.newaxis])
+    lengths = np.where(covered, lengths, 0)
+    total = _row_sum(lengths)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = _row_sum(lengths * middles) / total
+    # A maximum made of single points (triangular terms at height 1)
+    lom = np.where(active, right, -np.inf).max(axis=1)
+    return np.where(total > 0, mean, (som + lom) / 2)
+
+
+def _output_set(memberships, terms):
+    """Sorted breakpoints of the aggregated output set and its values there."""
+    a, b, c, d = terms.T
+    low, high = a.min(), d.max()
+    rising = [(a[q], b[q] - a[q]) for q in range(terms.shape[0]) if b[q] > a[q]]
+    falling = [(d[q], d[q] - c[q]) for q in range(terms.shape[0]) if d[q] > c[q]]
+
+    # Kinks that do not depend on the memberships: the trapezoid vertices and
+    # the crossings of edges belonging to different terms
+    fixed = list(terms.ravel())
+    for a1, w1 in rising:
+        for d2, w2 in falling:
+            fixed.append((a1 * w2 + d2 * w1) / (w1 + w2))
+    for edges in (rising, falling):
+        for i in range(len(edges)):
+            for j in range(i + 1, len(edges)):
+                (p1, w1), (p2, w2) = edges[i], edges[j]
+                if w1 != w2:
+                    fixed.append((p1 * w2 - p2 * w1) / (w2 - w1))
+    fixed = np.unique(np.clip(fixed, low, high))
+
+    # Kinks where an edge reaches the clipping level of some term
+    crossings = [a1 + memberships * w1 for a1, w1 in rising]
+    crossings += [d2 - memberships * w2 for d2, w2 in falling]
+    x = np.concatenate([np.broadcast_to(fixed, (memberships.shape[0], fixed.shape[0]))] + crossings, axis=1)
+    x = np.sort(x, axis=1)
+
+    y = np.zeros(x.shape)
+    for q in range(terms.shape[0]):
+        term = np.ones(x.shape)
+        if b[q] > a[q]:
+            np.minimum(term, (x - a[q]) / (b[q] - a[q]), out=term)
+        if d[q] > c[q]:
+            np.minimum(term, (d[q] - x) / (d[q] - c[q]), out=term)
+        np.clip(term, 0, memberships[:, q, np.newaxis], out=term)
+        np.maximum(y, term, out=y)
+    return x, y
+
+
+def _centroid(memberships, terms):
+    x, y = _output_set(memberships, terms)
+    x0, x1, y0, y1 = x[:, :-1], x[:, 1:], y[:, :-1], y[:, 1:]
+    dx = x1 - x0
+    area = _row_sum(dx * (y0 + y1) / 2)
+    moment = _row_sum(dx * (y0 * (2 * x0 + x1) + y1 * (x0 + 2 * x1)) / 6)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(area > 0, moment / area, np.nan)
+
+
+def _bisector(memberships, terms):
+    x, y = _output_set(memberships, terms)
+    x0, y0, y1 = x[:, :-1], y[:, :-1], y[:, 1:]
+    dx = x[:, 1:] - x0
+    area = dx * (y0 + y1) / 2
+    cumulative = np.cumsum(area, axis=1)
+    half = cumulative[:, -1] / 2
+    rows = np.arange(x.shape[0])
+    # First segment whose cumulative area reaches half of the total
+    i = (cumulative >= half[:, np.newaxis]).argmax(axis=1)
+    remaining = half - (cumulative[rows, i] - area[rows, i])
+    start, height = x0[rows, i], y0[rows, i]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (y1[rows, i] - height) / dx[rows, i]
+        # Solve height * t + slope * t^2 / 2 = remaining, in a form that stays
+        # stable for flat segments and segments starting at zero
+        t = 2 * remaining / (height + np.sqrt(height * height + 2 * slope * remaining))
+        return np.where(half > 0, start + t, np.nan)
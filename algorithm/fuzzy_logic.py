@@ -1,168 +1,272 @@
+import time
+from bisect import bisect_right
+
 import numpy as np
 
+from algorithm import defuzzification
+from algorithm.controller_config import compile_config, partition_breakpoints
+from algorithm.tracing import NULL_TRACER
+
+
+# FuzzyLogic is the controller of DEFAULT_CONFIG, compiled once at import
+_DEFAULT = compile_config()
+
+
 class FuzzyLogic():
 
-    RULES_SET = {
-        '002': 0,        '100': 2,        '101': 2,
-        '102': 3,        '110': 1,        '111': 1,
-        '112': 2,        '121': 0,        '122': 1,
-        '200': 3,        '201': 3,        '202': 3,
-        '210': 2,        '211': 2,        '212': 3,
-        '220': 1,        '221': 1,        '222': 2,
-        '300': 3,        '301': 3,        '302': 3,
-        '310': 2,        '311': 2,        '312': 3,
-        '320': 1,        '321': 2,        '322': 2
-    }
-
-    def __init__(self):
-        self.membership_values_of_temperature = np.array([0., 0., 0., 0.])
-        self.membership_values_of_soil_moisture = np.array([0., 0., 0., 0.])
-        self.membership_values_of_light_intensity = np.array([0., 0., 0.])
-        self.membership_values_of_watering_speed = np.array([0., 0., 0., 0.])
+    # The rules of DEFAULT_CONFIG keyed 'ijk': the term indices of temperature,
+    # soil moisture and light intensity, and the watering speed term they conclude
+    RULES_SET = {''.join(str(i) for i in key): consequent for key, consequent in sorted(_DEFAULT.rules.items())}
+
+    # RULES_SET compiled: a (temperature, soil moisture, light intensity)
+    # tensor of consequent indices and its validity mask.
+    RULE_CONSEQUENTS, RULE_MASK, CONSEQUENT_MASKS = (_DEFAULT.rule_consequents, _DEFAULT.rule_mask,
+                                                     _DEFAULT.consequent_masks)
+    # The tensor as nested lists for the scalar inference, -1 where there is no rule
+    _RULE_TABLE = RULE_CONSEQUENTS.tolist()
+
+    # Breakpoints of the trapezoidal input terms, in ascending order. Each pair
+    # of consecutive breakpoints bounds either a plateau (membership 1) or a
+    # ramp shared by two neighbouring terms.
+    TEMPERATURE_BREAKPOINTS, SOIL_MOISTURE_BREAKPOINTS, LIGHT_INTENSITY_BREAKPOINTS = (
+        partition_breakpoints(terms, name) for terms, name in zip(_DEFAULT.input_terms, _DEFAULT.input_names))
+
+    # Trapezoids (a, b, c, d) of Very Slow, Slow, Fast and Very Fast, in liters/minute
+    WATERING_SPEED_TERMS = tuple(tuple(abcd) for abcd in _DEFAULT.output_terms.tolist())
+
+    def __init__(self, tracer=None, defuzzification_method='average_maximum'):
+        if defuzzification_method not in defuzzification.METHODS:
+            raise ValueError("Unknown defuzzification method '{}', expected one of {}".format(defuzzification_method, defuzzification.METHODS))
+        # Receives every stage's values and timing; see algorithm/tracing.py
+        self.tracer = tracer if tracer is not None else NULL_TRACER
+        self.defuzzification_method = defuzzification_method
+        n_temperature, n_soil_moisture, n_light_intensity = self.RULE_MASK.shape
+        self.membership_values_of_temperature = np.zeros(n_temperature)
+        self.membership_values_of_soil_moisture = np.zeros(n_soil_moisture)
+        self.membership_values_of_light_intensity = np.zeros(n_light_intensity)
+        self.membership_values_of_watering_speed = np.zeros(len(self.WATERING_SPEED_TERMS))
         self.max1 = 0
         self.max2 = 0
         self.crisp_value = 0
         self.output = 0
 
     def do_fuzzification_of_temperature(self, temperature):
-        if temperature < 5:
-            self.membership_values_of_temperature[0] = 1
-        elif temperature >= 5 and temperature < 10:
-            self.membership_values_of_temperature[0] = (-1/5) * temperature + 2
-            self.membership_values_of_temperature[1] = (1/5) * temperature - 1
-        elif temperature >= 10 and temperature < 15:
-            self.membership_values_of_temperature[1] = 1
-        elif temperature >= 15 and temperature < 20:
-            self.membership_values_of_temperature[1] = (-1/5) * temperature + 4
-            self.membership_values_of_temperature[2] = (1/5) * temperature - 3
-        elif temperature >= 20 and temperature < 25:
-            self.membership_values_of_temperature[2] = 1
-        elif temperature >= 25 and temperature < 30:
-            self.membership_values_of_temperature[2] = (-1/5) * temperature + 6
-            self.membership_values_of_temperature[3] = (1/5) * temperature - 5
-        else:
-            self.membership_values_of_temperature[3] = 1
-        print("Fuzzy Temperature", end=": ")
-        print(self.membership_values_of_temperature)
+        start = time.perf_counter()
+        self._fuzzify(temperature, self.TEMPERATURE_BREAKPOINTS, self.membership_values_of_temperature)
+        self.tracer.record('fuzzification_of_temperature', time.perf_counter() - start,
+                           value=temperature, membership_values=self.membership_values_of_temperature)
 
     def do_fuzzification_of_soil_moisture(self, soil_moisture):
-        if soil_moisture < 25:
-            self.membership_values_of_soil_moisture[0] = 1
-        elif soil_moisture >= 25 and soil_moisture < 35:
-            self.membership_values_of_soil_moisture[0] = (-1/10) * soil_moisture + (7/2)
-            self.membership_values_of_soil_moisture[1] = (1/10) * soil_moisture - (5/2)
-        elif soil_moisture >= 35 and soil_moisture < 45:
-            self.membership_values_of_soil_moisture[1] = 1
-        elif soil_moisture >= 45 and soil_moisture < 55:
-            self.membership_values_of_soil_moisture[1] = (-1/10) * soil_moisture + (11/2)
-            self.membership_values_of_soil_moisture[2] = (1/10) * soil_moisture - (9/2)
-        elif soil_moisture >= 55 and soil_moisture < 65:
-            self.membership_values_of_soil_moisture[2] = 1
-        elif soil_moisture >= 65 and soil_moisture < 75:
-            self.membership_values_of_soil_moisture[2] = (-1/10) * soil_moisture + (15/2)
-            self.membership_values_of_soil_moisture[3] = (1/10) * soil_moisture - (13/2)
-        else:
-            self.membership_values_of_soil_moisture[3] = 1
-        print("Fuzzy Soil Moisture", end=": ")
-        print(self.membership_values_of_soil_moisture)
+        start = time.perf_counter()
+        self._fuzzify(soil_moisture, self.SOIL_MOISTURE_BREAKPOINTS, self.membership_values_of_soil_moisture)
+        self.tracer.record('fuzzification_of_soil_moisture', time.perf_counter() - start,
+                           value=soil_moisture, membership_values=self.membership_values_of_soil_moisture)
 
     def do_fuzzification_of_light_intensity(self, light_intensity):
-        if light_intensity < 300:
-            self.membership_values_of_light_intensity[0] = 1
-        elif light_intensity >= 300 and light_intensity < 400:
-            self.membership_values_of_light_intensity[0] = (-1/100) * light_intensity + 4
-            self.membership_values_of_light_intensity[1] = (1/100) * light_intensity - 3
-        elif light_intensity >= 400 and light_intensity < 700:
-            self.membership_values_of_light_intensity[1] = 1
-        elif light_intensity >= 700 and light_intensity < 800:
-            self.membership_values_of_light_intensity[1] = (-1/100) * light_intensity + 8
-            self.membership_values_of_light_intensity[2] = (1/100) * light_intensity - 7
+        start = time.perf_counter()
+        self._fuzzify(light_intensity, self.LIGHT_INTENSITY_BREAKPOINTS, self.membership_values_of_light_intensity)
+        self.tracer.record('fuzzification_of_light_intensity', time.perf_counter() - start,
+                           value=light_intensity, membership_values=self.membership_values_of_light_intensity)
+
+    @staticmethod
+    def _fuzzify(value, breakpoints, memberships):
+        # Values below the first breakpoint are on segment 0 and each breakpoint
+        # starts the next segment; NaN compares false and lands on the last.
+        # Even segments are a term's plateau, odd ones the ramp between two
+        # terms, and only the active terms are written.
+        memberships[:] = 0
+        segment = bisect_right(breakpoints, value)
+        if segment % 2 == 0:
+            memberships[segment // 2] = 1
         else:
-            self.membership_values_of_light_intensity[2] = 1
-        print("Fuzzy PAR Light Intensity", end=": ")
-        print(self.membership_values_of_light_intensity)
+            low, high = breakpoints[segment - 1], breakpoints[segment]
+            width = high - low
+            memberships[segment // 2] = (-1 / width) * value + high / width
+            memberships[segment // 2 + 1] = (1 / width) * value - low / width
 
     def do_fuzzy_inference(self):
-        rule_fired = False
-        for i in range(self.membership_values_of_temperature.shape[0]):
-            combination = ''
-            if self.membership_values_of_temperature[i] > 0:
-                combination += str(i)
-                for j in range(self.membership_values_of_soil_moisture.shape[0]):
-                    if self.membership_values_of_soil_moisture[j] > 0:
-                        combination += str(j)
-                        for k in range(self.membership_values_of_light_intensity.shape[0]):
-                            if self.membership_values_of_light_intensity[k] > 0:
-                                combination += str(k)
-                                if combination in self.RULES_SET:
-                                    rule_fired = True
-                                    [a, b, c] = [int(i) for i in list(combination)]
-                                    temperature = self.membership_values_of_temperature[a]
-                                    soil_moisture = self.membership_values_of_soil_moisture[b]
-                                    light_intensity = self.membership_values_of_light_intensity[c]
-                                    new_value = min(temperature, soil_moisture, light_intensity)
-                                    old_value = self.membership_values_of_watering_speed[self.RULES_SET[combination]]
-                                    self.membership_values_of_watering_speed[self.RULES_SET[combination]] = new_value if (new_value > old_value) else old_value
-
-                                combination = combination[0:2]
-                        combination = combination[0:1]
-        print("The Fuzzy Value of Watering Speed", end = ": ")
-        print(self.membership_values_of_watering_speed)
+        start = time.perf_counter()
+        # Only the non-zero terms can fire a rule, at most two per input, so
+        # the rule table is walked on plain floats instead of the whole
+        # tensor: min for AND, max to aggregate rules sharing a consequent
+        soil_moisture = self.membership_values_of_soil_moisture.tolist()
+        light_intensity = self.membership_values_of_light_intensity.tolist()
+        watering_speed = [0.] * len(self.WATERING_SPEED_TERMS)
+        rules_fired = 0
+        for a, temperature in enumerate(self.membership_values_of_temperature.tolist()):
+            if temperature > 0:
+                for b, moisture in enumerate(soil_moisture):
+                    if moisture > 0:
+                        consequents = self._RULE_TABLE[a][b]
+                        strength_ab = min(temperature, moisture)
+                        for c, light in enumerate(light_intensity):
+                            if light > 0 and consequents[c] >= 0:
+                                strength = min(strength_ab, light)
+                                rules_fired += 1
+                                if strength > watering_speed[consequents[c]]:
+                                    watering_speed[consequents[c]] = strength
+        # Recomputed from scratch, so no reset is needed
+        self.membership_values_of_watering_speed[:] = watering_speed
+        rule_fired = rules_fired > 0
+        self.tracer.record('fuzzy_inference', time.perf_counter() - start,
+                           membership_values=self.membership_values_of_watering_speed, rule_fired=rule_fired,
+                           rules_fired=rules_fired)
         return rule_fired
 
     def do_defuzzification_of_watering_speed(self):
+        start = time.perf_counter()
+        # The output terms are ordered left to right, so the maximum starts on
+        # the first term at the height and ends on the last one
         max_y = max(self.membership_values_of_watering_speed)
-        max_x1, max_x2 = 0, 0
-        set_x1 = False
-        
-        if self.membership_values_of_watering_speed[0] == max_y:
-            if max_y == 1:
-                max_x2 = 2
-            else:
-                max_x2 = 3 - max_y
-            set_x1 = True
-        if self.membership_values_of_watering_speed[1] == max_y:
-            if max_y == 1:
-                if set_x1 == False:
-                    max_x1 = 3
-                max_x2 = 5
-            else:
-                if set_x1 == False:
-                    max_x1 = max_y + 2
-                max_x2 = 6 - max_y
-            set_x1 = True
-        if self.membership_values_of_watering_speed[2] == max_y:
-            if max_y == 1:
-                if set_x1 == False:
-                    max_x1 = 6
-                max_x2 = 8
-            else:
-                if set_x1 == False:
-                    max_x1 = max_y + 5
-                max_x2 = 9 - max_y
-            set_x1 = True
-        if self.membership_values_of_watering_speed[3] == max_y:
-            if max_y == 1:
-                if set_x1 == False:
-                    max_x1 = 9
-                max_x2 = 12
-            else:
-                if set_x1 == False:
-                    max_x1 = max_y + 8
-                max_x2 = 12
-            set_x1 = True            
-        res = (max_x1 + max_x2) / 2
+        active = [q for q, membership in enumerate(self.membership_values_of_watering_speed) if membership == max_y]
+        a, b = self.WATERING_SPEED_TERMS[active[0]][:2]
+        c, d = self.WATERING_SPEED_TERMS[active[-1]][2:]
+        max_x1 = a + max_y * (b - a)
+        max_x2 = d - max_y * (d - c)
+        if self.defuzzification_method == 'average_maximum':
+            res = (max_x1 + max_x2) / 2
+        else:
+            res = defuzzification.defuzzify(self.membership_values_of_watering_speed, self.WATERING_SPEED_TERMS,
+                                            self.defuzzification_method)
         self.max1 = max_x1
         self.max2 = max_x2
         self.crisp_value = res
         self.output = res / 60000
-        print("The maximum head", end = ": ")
-        print(max_x1)
-        print("The maximum tail", end = ": ")
-        print(max_x2)
-        print("Average maximum", end = ": ")
-        print(self.crisp_value)
-        print("Convert to m3/s", end = ": ")
-        print("{:.10f}".format(self.output))
-        print("___________________________________________")
-    
\ No newline at end of file
+        self.tracer.record('defuzzification_of_watering_speed', time.perf_counter() - start,
+                           max1=self.max1, max2=self.max2, crisp_value=self.crisp_value, output=self.output)
+
+    def evaluate(self, temperature, soil_moisture, light_intensity, out=None):
+        """Run all three stages on one reading and return its crisp value.
+
+        Every stage starts from scratch, so one instance can be reused for any
+        number of readings; with the default 'average_maximum' method this
+        allocates no arrays. `out`, from evaluate_buffers(), also receives the
+        memberships and results under evaluate_batch's keys. Like the scalar
+        methods, crisp_value is computed even when no rule fired.
+        """
+        self.do_fuzzification_of_temperature(temperature)
+        self.do_fuzzification_of_soil_moisture(soil_moisture)
+        self.do_fuzzification_of_light_intensity(light_intensity)
+        rule_fired = self.do_fuzzy_inference()
+        self.do_defuzzification_of_watering_speed()
+        if out is not None:
+            out['membership_values_of_temperature'][:] = self.membership_values_of_temperature
+            out['membership_values_of_soil_moisture'][:] = self.membership_values_of_soil_moisture
+            out['membership_values_of_light_intensity'][:] = self.membership_values_of_light_intensity
+            out['membership_values_of_watering_speed'][:] = self.membership_values_of_watering_speed
+            out['rule_fired'][...] = rule_fired
+            out['max1'][...] = self.max1
+            out['max2'][...] = self.max2
+            out['crisp_value'][...] = self.crisp_value
+            out['output'][...] = self.output
+        return self.crisp_value
+
+    @classmethod
+    def evaluate_buffers(cls):
+        """Preallocated `out` for evaluate(): evaluate_batch's keys for a single reading."""
+        n_temperature, n_soil_moisture, n_light_intensity = cls.RULE_MASK.shape
+        return {
+            'membership_values_of_temperature': np.zeros(n_temperature),
+            'membership_values_of_soil_moisture': np.zeros(n_soil_moisture),
+            'membership_values_of_light_intensity': np.zeros(n_light_intensity),
+            'membership_values_of_watering_speed': np.zeros(len(cls.WATERING_SPEED_TERMS)),
+            'rule_fired': np.zeros((), dtype=bool),
+            'max1': np.zeros(()),
+            'max2': np.zeros(()),
+            'crisp_value': np.zeros(()),
+            'output': np.zeros(())
+        }
+
+    @classmethod
+    def evaluate_batch(cls, temperatures, soil_moistures, light_intensities, tracer=None,
+                       defuzzification_method='average_maximum'):
+        """Run fuzzification, inference and defuzzification over whole arrays.
+
+        Returns a dict of NumPy arrays with one row per reading, keyed like the
+        instance attributes of the scalar path, plus a 'rule_fired' mask. Every
+        value matches what a fresh FuzzyLogic() would compute for that reading.
+        The optional tracer gets one timing record per stage for the batch, and
+        defuzzification_method picks the crisp value as in algorithm/defuzzification.py.
+        """
+        tracer = tracer if tracer is not None else NULL_TRACER
+        temperatures = np.asarray(temperatures, dtype=float).ravel()
+        soil_moistures = np.asarray(soil_moistures, dtype=float).ravel()
+        light_intensities = np.asarray(light_intensities, dtype=float).ravel()
+        if not (temperatures.shape == soil_moistures.shape == light_intensities.shape):
+            raise ValueError("temperatures, soil_moistures and light_intensities must have the same length")
+
+        start = time.perf_counter()
+        mu_temperature = cls._fuzzify_batch(temperatures, cls.TEMPERATURE_BREAKPOINTS)
+        mu_soil_moisture = cls._fuzzify_batch(soil_moistures, cls.SOIL_MOISTURE_BREAKPOINTS)
+        mu_light_intensity = cls._fuzzify_batch(light_intensities, cls.LIGHT_INTENSITY_BREAKPOINTS)
+        start = cls._trace_batch_stage(tracer, 'fuzzification', start, temperatures.shape[0])
+
+        # Fuzzy inference: min for AND, max to aggregate rules sharing a consequent
+        mu_watering_speed = np.zeros((len(cls.WATERING_SPEED_TERMS), temperatures.shape[0])).T
+        strength = np.empty(temperatures.shape[0])
+        # Counting the fired rules costs a pass per rule, so only when someone is listening
+        counting = tracer is not NULL_TRACER
+        rules_fired = 0
+        for a, b, c in zip(*np.nonzero(cls.RULE_MASK)):
+            speed = cls.RULE_CONSEQUENTS[a, b, c]
+            np.minimum(mu_temperature[:, a], mu_soil_moisture[:, b], out=strength)
+            np.minimum(strength, mu_light_intensity[:, c], out=strength)
+            np.maximum(mu_watering_speed[:, speed], strength, out=mu_watering_speed[:, speed])
+            if counting:
+                rules_fired += int(np.count_nonzero(strength))
+        rule_fired = mu_watering_speed.max(axis=1) > 0
+        counters = {'rules_fired': rules_fired, 'rows_fired': int(np.count_nonzero(rule_fired))} if counting else {}
+        start = cls._trace_batch_stage(tracer, 'fuzzy_inference', start, temperatures.shape[0], **counters)
+
+        max1, max2 = defuzzification.extremes_of_maximum(mu_watering_speed, _DEFAULT.output_terms)
+        if defuzzification_method == 'average_maximum':
+            crisp_value = (max1 + max2) / 2
+        else:
+            crisp_value = defuzzification.defuzzify_batch(mu_watering_speed, cls.WATERING_SPEED_TERMS,
+                                                          defuzzification_method)
+        cls._trace_batch_stage(tracer, 'defuzzification', start, temperatures.shape[0])
+        return {
+            'membership_values_of_temperature': mu_temperature,
+            'membership_values_of_soil_moisture': mu_soil_moisture,
+            'membership_values_of_light_intensity': mu_light_intensity,
+            'membership_values_of_watering_speed': mu_watering_speed,
+            'rule_fired': rule_fired,
+            'max1': max1,
+            'max2': max2,
+            'crisp_value': crisp_value,
+            'output': crisp_value / 60000
+        }
+
+    @staticmethod
+    def _trace_batch_stage(tracer, stage, start, rows, **values):
+        now = time.perf_counter()
+        tracer.record('batch_' + stage, now - start, rows=rows, **values)
+        return now
+
+    @staticmethod
+    def _fuzzify_batch(values, breakpoints):
+        # Each ramp between two breakpoints is the same straight line as in the
+        # scalar methods, clipped to [0, 1]; a term is the min of its two edges.
+        # The result is column-major so that every term is a contiguous column.
+        edges = np.asarray(breakpoints, dtype=float)
+        n_terms = edges.shape[0] // 2 + 1
+        memberships = np.ones((n_terms, values.shape[0]))
+        edge = np.empty(values.shape[0])
+        for r in range(n_terms - 1):
+            low, high = edges[2 * r], edges[2 * r + 1]
+            width = high - low
+            np.multiply(values, -1 / width, out=edge)
+            edge += high / width
+            np.clip(edge, 0, 1, out=edge)
+            np.minimum(memberships[r], edge, out=memberships[r])
+            np.multiply(values, 1 / width, out=edge)
+            edge -= low / width
+            np.clip(edge, 0, 1, out=edge)
+            np.minimum(memberships[r + 1], edge, out=memberships[r + 1])
+        # NaN compares false against every breakpoint, so the scalar methods
+        # end up in their trailing else branch: only the last term is 1
+        nan = np.isnan(values)
+        if nan.any():
+            memberships[:, nan] = 0
+            memberships[-1, nan] = 1
+        return memberships.T
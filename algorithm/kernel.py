@@ -0,0 +1,126 @@
+"""Fused inference kernel for CompiledController, compiled by Numba when installed.
+
+The kernel makes one pass over the readings, a block of rows at a time, with
+the same floating-point operations as the NumPy path, so the results are
+identical. Numba compiles it with nogil=True: a thread running it releases
+the GIL for the whole batch, so threads sharing one controller run in
+parallel. Without Numba, numba_kernel() returns None.
+"""
+import math
+import threading
+
+import numpy as np
+
+_kernel = None
+_kernel_lock = threading.Lock()
+
+
+def ramp_coefficients(terms):
+    """Scale and offset of the rising and falling edge of every (a, b, c, d) term.
+
+    The same divisions as the NumPy fuzzification, done once; a vertical edge
+    gets a zero scale.
+    """
+    ramps = np.zeros(terms.shape)
+    for index in np.ndindex(*terms.shape[:-1]):
+        a, b, c, d = terms[index]
+        if b > a:
+            ramps[index + (0,)], ramps[index + (1,)] = 1 / (b - a), a / (b - a)
+        if d > c:
+            ramps[index + (2,)], ramps[index + (3,)] = -1 / (d - c), d / (d - c)
+    return ramps
+
+
+def fused_evaluate(inputs, terms, ramps, term_counts, rules, consequents, output_terms, ordered,
+                   memberships, mu_output, max1, max2, block=1024):
+    """Evaluate rows into preallocated arrays.
+
+    inputs is (n_inputs, rows); terms is (n_inputs, max_terms, 4) padded with
+    zeros past term_counts, and ramps its ramp_coefficients(); rules is
+    (n_rules, n_inputs) of term indices with their output term in
+    consequents. memberships is (n_inputs, max_terms, rows), mu_output
+    (n_outputs, rows) and max1/max2 (rows,), all written.
+
+    Rows go through every stage `block` at a time, so the block's memberships
+    stay in cache and the inner loops run over contiguous rows.
+    """
+    n_inputs, rows = inputs.shape
+    n_outputs = output_terms.shape[0]
+    strength = np.empty(block)
+    for start in range(0, rows, block):
+        stop = min(start + block, rows)
+        for i in range(n_inputs):
+            last = term_counts[i] - 1
+            for q in range(term_counts[i]):
+                a, b, c, d = terms[i, q, 0], terms[i, q, 1], terms[i, q, 2], terms[i, q, 3]
+                rise_scale, rise_offset, fall_scale, fall_offset = ramps[i, q, 0], ramps[i, q, 1], ramps[i, q, 2], ramps[i, q, 3]
+                for row in range(start, stop):
+                    value = inputs[i, row]
+                    membership = 1.
+                    if b > a:
+                        membership = min(membership, min(max(value * rise_scale - rise_offset, 0.), 1.))
+                    elif q > 0 and value < a:
+                        membership = 0.
+                    if d > c:
+                        membership = min(membership, min(max(value * fall_scale + fall_offset, 0.), 1.))
+                    elif q < last and value > d:
+                        membership = 0.
+                    memberships[i, q, row] = membership
+            # NaN readings take the last term, like FuzzyLogic
+            for row in range(start, stop):
+                if math.isnan(inputs[i, row]):
+                    for q in range(term_counts[i]):
+                        memberships[i, q, row] = 1. if q == last else 0.
+
+        # Fuzzy inference: min for AND, max to aggregate rules sharing a consequent
+        mu_output[:, start:stop] = 0.
+        for r in range(rules.shape[0]):
+            strength[:stop - start] = memberships[0, rules[r, 0], start:stop]
+            for i in range(1, n_inputs):
+                term = rules[r, i]
+                for row in range(start, stop):
+                    strength[row - start] = min(strength[row - start], memberships[i, term, row])
+            consequent = consequents[r]
+            for row in range(start, stop):
+                mu_output[consequent, row] = max(mu_output[consequent, row], strength[row - start])
+
+        # Extremes of maximum, as in defuzzification.extremes_of_maximum
+        for row in range(start, stop):
+            height = mu_output[0, row]
+            for q in range(1, n_outputs):
+                height = max(height, mu_output[q, row])
+            som, lom = np.inf, -np.inf
+            first, last_active = -1, -1
+            for q in range(n_outputs):
+                if mu_output[q, row] == height:
+                    if first < 0:
+                        first = q
+                    last_active = q
+                    if not ordered:
+                        a, b, c, d = output_terms[q, 0], output_terms[q, 1], output_terms[q, 2], output_terms[q, 3]
+                        som = min(som, a + height * (b - a))
+                        lom = max(lom, d - height * (d - c))
+            if ordered:
+                # The first and last active terms hold the extremes
+                a, b = output_terms[first, 0], output_terms[first, 1]
+                c, d = output_terms[last_active, 2], output_terms[last_active, 3]
+                som, lom = a + height * (b - a), d - height * (d - c)
+            max1[row] = som
+            max2[row] = lom
+
+
+def numba_kernel():
+    """fused_evaluate compiled with nogil, or None when Numba is not installed.
+
+    Compiled on first use and cached on disk next to this module.
+    """
+    global _kernel
+    with _kernel_lock:
+        if _kernel is None:
+            try:
+                import numba
+            except ImportError:
+                _kernel = False
+            else:
+                _kernel = numba.njit(nogil=True, cache=True)(fused_evaluate)
+        return _kernel or None
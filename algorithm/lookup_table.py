@@ -0,0 +1,163 @@
+import argparse
+
+import numpy as np
+
+from algorithm.controller_config import DEFAULT_CONFIG
+from algorithm.fuzzy_logic import FuzzyLogic
+
+# Universes of the controller inputs, the ranges accepted by the Streamlit pages
+DOMAIN = tuple((float(low), float(high)) for low, high in (variable['universe'] for variable in DEFAULT_CONFIG['inputs']))
+
+# Default grid steps. Every breakpoint of the input membership functions is a
+# multiple of its step, so the kinks of the fuzzification fall on grid nodes.
+STEPS = (1., 1., 10.)
+
+
+class LookupTable(object):
+    """crisp_value precomputed on a regular (temperature, soil moisture, light) grid.
+
+    Queries take O(1) per reading: the cell is found by arithmetic on the
+    regular axes and the value trilinearly interpolated. Readings on grid nodes
+    return the exact FuzzyLogic value; between nodes the table is an
+    approximation, worst where the crisp value jumps (see max_error()), so it
+    is not a drop-in replacement for FuzzyLogic unless queried with
+    exact=True.
+
+    Where no rule fires the crisp value is a constant (6 liters/minute, NaN
+    for the centroid) that does not interpolate with its neighbours. With
+    breakpoints on nodes (breakpoints_on_nodes, true for the default steps),
+    a cell whose nodes all fire no rule fires none inside and returns that
+    constant. Cells mixing both, and with other steps every cell with a node
+    firing no rule, are evaluated exactly.
+    """
+
+    def __init__(self, values, rule_fired, starts, steps, defuzzification_method='average_maximum'):
+        self.values = values
+        self.rule_fired = rule_fired
+        # Number of nodes firing a rule, per cell
+        self.cell_fired = sum(rule_fired[i:i + rule_fired.shape[0] - 1, j:j + rule_fired.shape[1] - 1,
+                                         k:k + rule_fired.shape[2] - 1].astype(np.uint8)
+                              for i in (0, 1) for j in (0, 1) for k in (0, 1))
+        self.starts = np.asarray(starts, dtype=float)
+        self.steps = np.asarray(steps, dtype=float)
+        self.defuzzification_method = defuzzification_method
+        positions = [(np.asarray(breakpoints) - start) / step for breakpoints, start, step in
+                     zip((FuzzyLogic.TEMPERATURE_BREAKPOINTS, FuzzyLogic.SOIL_MOISTURE_BREAKPOINTS,
+                          FuzzyLogic.LIGHT_INTENSITY_BREAKPOINTS), self.starts, self.steps)]
+        self.breakpoints_on_nodes = all(np.allclose(position, np.round(position), rtol=0, atol=1e-9)
+                                        for position in positions)
+
+    @property
+    def stops(self):
+        return self.starts + self.steps * (np.array(self.values.shape) - 1)
+
+    @classmethod
+    def build(cls, steps=STEPS, domain=DOMAIN, defuzzification_method='average_maximum'):
+        """Evaluate FuzzyLogic on every grid node, one temperature slice at a time."""
+        starts = np.array([low for low, high in domain], dtype=float)
+        steps = np.asarray(steps, dtype=float)
+        counts = [int(round((high - low) / step)) + 1 for (low, high), step in zip(domain, steps)]
+        axes = [start + step * np.arange(count) for start, step, count in zip(starts, steps, counts)]
+        values = np.empty(counts)
+        rule_fired = np.empty(counts, dtype=bool)
+        soil_moistures, light_intensities = np.meshgrid(axes[1], axes[2], indexing='ij')
+        for i, temperature in enumerate(axes[0]):
+            result = FuzzyLogic.evaluate_batch(np.full(soil_moistures.size, temperature),
+                                               soil_moistures.ravel(), light_intensities.ravel(),
+                                               defuzzification_method=defuzzification_method)
+            values[i] = result['crisp_value'].reshape(soil_moistures.shape)
+            rule_fired[i] = result['rule_fired'].reshape(soil_moistures.shape)
+        return cls(values, rule_fired, starts, steps, defuzzification_method)
+
+    def save(self, path):
+        """Write the table to `path`.npy and its grid to `path`.grid.npz."""
+        np.save(path + '.npy', self.values)
+        np.savez(path + '.grid.npz', rule_fired=self.rule_fired, starts=self.starts, steps=self.steps,
+                 defuzzification_method=self.defuzzification_method)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Read a table written by save(); memory-mapped read-only by default."""
+        values = np.load(path + '.npy', mmap_mode='r' if mmap else None)
+        with np.load(path + '.grid.npz') as grid:
+            return cls(values, grid['rule_fired'], grid['starts'], grid['steps'],
+                       str(grid['defuzzification_method']))
+
+    def lookup(self, temperatures, soil_moistures, light_intensities, exact=False):
+        """Interpolated crisp_value (liters/minute) for arrays of readings.
+
+        Readings outside the grid are clamped to its edges and NaN readings
+        take the upper edge, the last term as in FuzzyLogic. With exact=True
+        only readings on grid nodes, which include every breakpoint of the
+        default grid, come from the table and the rest are evaluated with
+        FuzzyLogic, so results equal FuzzyLogic.evaluate_batch().
+        """
+        points = [np.asarray(values, dtype=float).ravel()
+                  for values in (temperatures, soil_moistures, light_intensities)]
+        indices, fractions = [], []
+        off_grid = np.zeros(points[0].shape[0], dtype=bool) if exact else None
+        for axis, x in enumerate(points):
+            size = self.values.shape[axis]
+            position = np.clip((x - self.starts[axis]) / self.steps[axis], 0, size - 1)
+            position[np.isnan(position)] = size - 1
+            index = np.minimum(position.astype(np.intp), size - 2)
+            indices.append(index)
+            fractions.append(position - index)
+            if exact:
+                # NaN compares False, so NaN readings are evaluated too
+                off_grid |= ~((x >= self.starts[axis]) & (x <= self.stops[axis]))
+                off_grid |= (fractions[-1] != 0) & (fractions[-1] != 1)
+        (i, j, k), (u, v, w) = indices, fractions
+        values = self.values
+        crisp_value = ((1 - u) * ((1 - v) * ((1 - w) * values[i, j, k] + w * values[i, j, k + 1])
+                                  + v * ((1 - w) * values[i, j + 1, k] + w * values[i, j + 1, k + 1]))
+                       + u * ((1 - v) * ((1 - w) * values[i + 1, j, k] + w * values[i + 1, j, k + 1])
+                              + v * ((1 - w) * values[i + 1, j + 1, k] + w * values[i + 1, j + 1, k + 1])))
+        fired = self.cell_fired[i, j, k]
+        if self.breakpoints_on_nodes:
+            unfired = fired == 0
+            if unfired.any():
+                crisp_value[unfired] = values[i[unfired], j[unfired], k[unfired]]
+            evaluate = (fired != 0) & (fired != 8)
+        else:
+            # A cell straddling a breakpoint can fire rules inside that none of its nodes fire
+            evaluate = fired != 8
+        if exact:
+            evaluate |= off_grid
+        if evaluate.any():
+            crisp_value[evaluate] = FuzzyLogic.evaluate_batch(
+                *[x[evaluate] for x in points], defuzzification_method=self.defuzzification_method)['crisp_value']
+        return crisp_value
+
+    def max_error(self, samples=100000, seed=0, exact=False):
+        """Largest |lookup - FuzzyLogic| in liters/minute over uniform random readings.
+
+        A reading that is NaN on one side only counts as an infinite error.
+        """
+        rng = np.random.default_rng(seed)
+        readings = [rng.uniform(low, high, samples) for low, high in zip(self.starts, self.stops)]
+        exact_values = FuzzyLogic.evaluate_batch(*readings, defuzzification_method=self.defuzzification_method)['crisp_value']
+        values = self.lookup(*readings, exact=exact)
+        error = np.abs(values - exact_values)
+        error[np.isnan(values) & np.isnan(exact_values)] = 0
+        error[np.isnan(error)] = np.inf
+        return float(error.max())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a crisp-value lookup table")
+    parser.add_argument('path', help="output prefix, writes PATH.npy and PATH.grid.npz")
+    parser.add_argument('--steps', nargs=3, type=float, default=list(STEPS),
+                        metavar=('TEMPERATURE', 'SOIL_MOISTURE', 'LIGHT_INTENSITY'))
+    parser.add_argument('--method', default='average_maximum', help="defuzzification method")
+    args = parser.parse_args(argv)
+
+    table = LookupTable.build(args.steps, defuzzification_method=args.method)
+    table.save(args.path)
+    print("{} nodes, {:.1f} MiB".format(table.values.size, table.values.nbytes / 2 ** 20))
+    print("max error against FuzzyLogic: {:.4f} liters/minute interpolated, {:.4f} with exact=True".format(
+        table.max_error(), table.max_error(exact=True)))
+
+
+if __name__ == '__main__':
+    main()
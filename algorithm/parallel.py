@@ -0,0 +1,116 @@
+"""Score large reading arrays on several cores.
+
+Readings are copied once into a shared-memory block, every worker evaluates
+its chunks with FuzzyLogic.evaluate_batch straight from that block and writes
+the results into a second preallocated shared block, so no arrays are
+pickled between processes. Each chunk owns a fixed slice of the output, which
+makes the result identical to one serial evaluate_batch call whatever the
+worker count or completion order.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from algorithm.fuzzy_logic import FuzzyLogic
+
+# Float result columns, in the order they are stored in the output block
+OUTPUTS = ('crisp_value', 'output')
+
+# Shared blocks of the current evaluate() call attached by this worker, by name
+_attached = {}
+
+
+def _attach(*names):
+    """Attach the named blocks once per worker and release those of earlier calls."""
+    for name in list(_attached):
+        if name not in names:
+            _attached.pop(name).close()
+    for name in names:
+        if name not in _attached:
+            _attached[name] = shared_memory.SharedMemory(name=name)
+    return [_attached[name] for name in names]
+
+
+def _evaluate_chunk(input_name, output_name, rows, start, stop, defuzzification_method):
+    input_block, output_block = _attach(input_name, output_name)
+    inputs = np.ndarray((3, rows), dtype=float, buffer=input_block.buf)
+    outputs = np.ndarray((len(OUTPUTS) + 1, rows), dtype=float, buffer=output_block.buf)
+    result = FuzzyLogic.evaluate_batch(inputs[0, start:stop], inputs[1, start:stop], inputs[2, start:stop],
+                                       defuzzification_method=defuzzification_method)
+    for i, key in enumerate(OUTPUTS):
+        outputs[i, start:stop] = result[key]
+    outputs[-1, start:stop] = result['rule_fired']
+    # Drop the views before the block can be closed
+    del inputs, outputs
+
+
+class ParallelEvaluator(object):
+    """Process pool evaluating readings in chunks of `chunk_rows`.
+
+    `workers` defaults to os.cpu_count(). The pool is started on first use and
+    reused across evaluate() calls until close(); it is also a context manager.
+    """
+
+    def __init__(self, workers=None, chunk_rows=262144, defuzzification_method='average_maximum'):
+        if chunk_rows < 1:
+            raise ValueError("chunk_rows must be at least 1")
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.chunk_rows = chunk_rows
+        self.defuzzification_method = defuzzification_method
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def evaluate(self, temperatures, soil_moistures, light_intensities):
+        """Dict of 'crisp_value', 'output' and 'rule_fired' arrays, one row per reading."""
+        readings = [np.asarray(values, dtype=float).ravel()
+                    for values in (temperatures, soil_moistures, light_intensities)]
+        if not (readings[0].shape == readings[1].shape == readings[2].shape):
+            raise ValueError("temperatures, soil_moistures and light_intensities must have the same length")
+        rows = readings[0].shape[0]
+        if rows == 0:
+            return {'crisp_value': np.empty(0), 'output': np.empty(0), 'rule_fired': np.empty(0, dtype=bool)}
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers)
+
+        input_block = shared_memory.SharedMemory(create=True, size=3 * rows * 8)
+        output_block = shared_memory.SharedMemory(create=True, size=(len(OUTPUTS) + 1) * rows * 8)
+        inputs = outputs = None
+        try:
+            inputs = np.ndarray((3, rows), dtype=float, buffer=input_block.buf)
+            for i, values in enumerate(readings):
+                inputs[i] = values
+            futures = [self.pool.submit(_evaluate_chunk, input_block.name, output_block.name, rows,
+                                        start, min(start + self.chunk_rows, rows), self.defuzzification_method)
+                       for start in range(0, rows, self.chunk_rows)]
+            for future in futures:
+                future.result()
+            outputs = np.ndarray((len(OUTPUTS) + 1, rows), dtype=float, buffer=output_block.buf)
+            result = {key: outputs[i].copy() for i, key in enumerate(OUTPUTS)}
+            result['rule_fired'] = outputs[-1] != 0
+        finally:
+            # The blocks cannot be closed while views on them exist
+            inputs = outputs = None
+            input_block.close()
+            input_block.unlink()
+            output_block.close()
+            output_block.unlink()
+        return result
+
+
+def evaluate_parallel(temperatures, soil_moistures, light_intensities, workers=None, chunk_rows=262144,
+                      defuzzification_method='average_maximum'):
+    """One-off ParallelEvaluator.evaluate() with a pool started and stopped around it."""
+    with ParallelEvaluator(workers, chunk_rows, defuzzification_method) as evaluator:
+        return evaluator.evaluate(temperatures, soil_moistures, light_intensities)
@@ -0,0 +1,67 @@
+import collections
+import io
+import threading
+
+import numpy as np
+
+
+class RenderCache(object):
+    """LRU cache of encoded figure images (PNG or SVG bytes).
+
+    get() only calls `draw` on a miss, encodes the figure it returns and
+    closes it, so repeated inputs skip matplotlib entirely and pyplot never
+    holds on to old figures. Safe to share between Streamlit sessions.
+    """
+
+    def __init__(self, max_entries=256, image_format='png', dpi=150):
+        if image_format not in ('png', 'svg'):
+            raise ValueError("image_format must be 'png' or 'svg'")
+        self.max_entries = max_entries
+        self.image_format = image_format
+        self.dpi = dpi
+        self.images = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.images)
+
+    def clear(self):
+        with self.lock:
+            self.images.clear()
+
+    def get(self, key, draw):
+        """Image bytes for key, drawing the figure with draw() on a miss."""
+        with self.lock:
+            if key in self.images:
+                self.hits += 1
+                self.images.move_to_end(key)
+                return self.images[key]
+            self.misses += 1
+        image = self.encode(draw())
+        with self.lock:
+            self.images[key] = image
+            self.images.move_to_end(key)
+            while len(self.images) > self.max_entries:
+                self.images.popitem(last=False)
+        return image
+
+    def encode(self, fig):
+        import matplotlib.pyplot as plt
+        buffer = io.BytesIO()
+        try:
+            fig.savefig(buffer, format=self.image_format, dpi=self.dpi, bbox_inches='tight')
+        finally:
+            plt.close(fig)
+        return buffer.getvalue()
+
+    def variable(self, visualizer_class, membership_values, crisp_value, decimals=2):
+        """Image of a VariableVisualizer subclass, keyed by (variable, rounded input, memberships)."""
+        key = (visualizer_class.__name__, round(float(crisp_value), decimals),
+               tuple(np.round(membership_values, 6).tolist()))
+        return self.get(key, lambda: visualizer_class(membership_values, crisp_value).plot()[0])
+
+
+# Shared by every session of the Streamlit server
+RENDER_CACHE = RenderCache()
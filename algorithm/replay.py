@@ -0,0 +1,188 @@
+"""Replay sensor logs through FuzzyLogic in bounded memory.
+
+    python -m algorithm.replay --input log.csv --output decisions.parquet
+    python -m algorithm.replay --binary t.f64 m.f64 l.f64 --output decisions.csv
+
+Readings are read, evaluated and written one chunk at a time, so memory stays
+flat whatever the log size. CSV needs pandas, Parquet needs pyarrow.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from algorithm.fuzzy_logic import FuzzyLogic
+from algorithm.tracing import NULL_TRACER, MetricsTracer, stage_timer
+
+COLUMNS = ('temperature', 'soil_moisture', 'light_intensity')
+
+
+def read_csv_chunks(path, columns=COLUMNS, chunk_rows=262144):
+    """Yield (temperatures, soil_moistures, light_intensities) arrays from a CSV file."""
+    import pandas as pd
+    for frame in pd.read_csv(path, usecols=list(columns), chunksize=chunk_rows, float_precision='round_trip'):
+        yield tuple(frame[name].to_numpy(dtype=float) for name in columns)
+
+
+def read_parquet_chunks(path, columns=COLUMNS, chunk_rows=262144):
+    """Yield (temperatures, soil_moistures, light_intensities) arrays from a Parquet file."""
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=list(columns)):
+        yield tuple(batch.column(name).to_numpy(zero_copy_only=False).astype(float, copy=False)
+                    for name in columns)
+
+
+def read_binary_chunks(paths, dtype='<f8', chunk_rows=262144):
+    """Yield chunks of three memory-mapped raw column files, one value per reading."""
+    columns = [np.memmap(path, dtype=dtype, mode='r') for path in paths]
+    rows = columns[0].shape[0]
+    if any(column.shape[0] != rows for column in columns):
+        raise ValueError("Binary column files must hold the same number of values")
+    for start in range(0, rows, chunk_rows):
+        yield tuple(np.asarray(column[start:start + chunk_rows], dtype=float) for column in columns)
+
+
+def read_chunks(path, columns=COLUMNS, chunk_rows=262144):
+    """Pick the reader from the file extension."""
+    if path.endswith('.parquet') or path.endswith('.pq'):
+        return read_parquet_chunks(path, columns, chunk_rows)
+    return read_csv_chunks(path, columns, chunk_rows)
+
+
+def evaluate_chunks(chunks, defuzzification_method='average_maximum', evaluator=None, tracer=None):
+    """Yield a dict of input and output columns for every chunk of readings.
+
+    Chunks are evaluated in this process, or by `evaluator` (a
+    ParallelEvaluator) when given. `tracer` gets the batch stage records of
+    in-process evaluations.
+    """
+    for temperatures, soil_moistures, light_intensities in chunks:
+        if evaluator is not None:
+            result = evaluator.evaluate(temperatures, soil_moistures, light_intensities)
+        else:
+            result = FuzzyLogic.evaluate_batch(temperatures, soil_moistures, light_intensities, tracer=tracer,
+                                               defuzzification_method=defuzzification_method)
+        yield {
+            'temperature': temperatures,
+            'soil_moisture': soil_moistures,
+            'light_intensity': light_intensities,
+            'watering_speed_l_min': result['crisp_value'],
+            'watering_speed_m3_s': result['output'],
+            'rule_fired': result['rule_fired']
+        }
+
+
+class CsvSink(object):
+    """Append result chunks to a CSV file, writing the header once."""
+
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, columns):
+        import pandas as pd
+        pd.DataFrame(columns).to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class ParquetSink(object):
+    """Append result chunks to a Parquet file as row groups."""
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def write(self, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.table(columns)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_sink(path):
+    if path.endswith('.parquet') or path.endswith('.pq'):
+        return ParquetSink(path)
+    return CsvSink(path)
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def replay(chunks, sink, defuzzification_method='average_maximum', evaluator=None, tracer=None):
+    """Evaluate every chunk and write it to sink; returns (rows, seconds)."""
+    tracer = tracer if tracer is not None else NULL_TRACER
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for columns in evaluate_chunks(chunks, defuzzification_method, evaluator, tracer):
+            with stage_timer(tracer, 'sink_write', rows=columns['temperature'].shape[0]):
+                sink.write(columns)
+            rows += columns['temperature'].shape[0]
+    finally:
+        sink.close()
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute watering decisions from sensor logs")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help="CSV or Parquet log")
+    source.add_argument('--binary', nargs=3, metavar=('TEMPERATURE', 'SOIL_MOISTURE', 'LIGHT_INTENSITY'),
+                        help="raw column files, memory-mapped")
+    parser.add_argument('--output', required=True, help="CSV or Parquet file to write")
+    parser.add_argument('--columns', nargs=3, default=list(COLUMNS),
+                        metavar=('TEMPERATURE', 'SOIL_MOISTURE', 'LIGHT_INTENSITY'),
+                        help="input column names")
+    parser.add_argument('--dtype', default='<f8', help="dtype of the --binary files")
+    parser.add_argument('--chunk-rows', type=int, default=262144)
+    parser.add_argument('--method', default='average_maximum', help="defuzzification method")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes sharing each chunk; 1 evaluates in this process")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="write stage timings and rule counters to PATH in Prometheus text format")
+    args = parser.parse_args(argv)
+
+    if args.binary:
+        chunks = read_binary_chunks(args.binary, args.dtype, args.chunk_rows)
+    else:
+        chunks = read_chunks(args.input, args.columns, args.chunk_rows)
+    evaluator = None
+    if args.workers > 1:
+        from algorithm.parallel import ParallelEvaluator
+        evaluator = ParallelEvaluator(args.workers, -(-args.chunk_rows // args.workers), args.method)
+    metrics = MetricsTracer() if args.metrics else None
+    try:
+        rows, seconds = replay(chunks, open_sink(args.output), args.method, evaluator, metrics)
+    finally:
+        if evaluator is not None:
+            evaluator.close()
+    if metrics is not None:
+        with open(args.metrics, 'w', encoding='utf-8') as file:
+            file.write(metrics.prometheus())
+
+    print("{} rows in {:.2f} s ({:.0f} rows/s)".format(rows, seconds, rows / seconds if seconds > 0 else 0))
+    peak = peak_rss_bytes()
+    if peak is not None:
+        print("peak RSS {:.1f} MiB".format(peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
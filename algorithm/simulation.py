@@ -0,0 +1,228 @@
+"""Multi-day greenhouse runs with the controller in the loop.
+
+Every zone is a bucket of root-zone water. Each simulated minute, the weather
+sets temperature and PAR, evapotranspiration and drainage take water out, and
+the watering speed chosen by the controller puts it back:
+
+    python -m algorithm.simulation --zones 10000 --days 7
+
+All zones advance together as NumPy arrays; the controller is evaluated for
+every zone at once every `control_interval` minutes and its flow is held in
+between, like a valve.
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from algorithm.controller_config import DEFAULT_CONFIG
+from algorithm.fuzzy_logic import FuzzyLogic
+
+MINUTES_PER_DAY = 1440
+
+
+def _soil_moisture_terms():
+    return next(variable['terms'] for variable in DEFAULT_CONFIG['inputs'] if variable['name'] == 'soil_moisture')
+
+
+# Soil moisture classes and the crossover points of their membership
+# functions, where each term's falling ramp meets the next term's rising one
+MOISTURE_CLASSES = tuple(_soil_moisture_terms())
+MOISTURE_BOUNDS = tuple((c + d) / 2. for a, b, c, d in list(_soil_moisture_terms().values())[:-1])
+
+
+class DiurnalWeather(object):
+    """Synthetic weather: daily sine waves of temperature and PAR.
+
+    Temperature peaks mid-afternoon with a fixed offset per zone; light rises
+    at 06:00, peaks at noon and is scaled by a random cloud cover per zone and
+    day. Calling it with a minute returns (temperatures, light_intensities),
+    written into the same two arrays every time.
+    """
+
+    def __init__(self, zones, days, mean_temperature=22., temperature_amplitude=7., peak_light=900., seed=0):
+        rng = np.random.default_rng(seed)
+        self.mean_temperature = mean_temperature
+        self.temperature_amplitude = temperature_amplitude
+        self.peak_light = peak_light
+        self.temperature_offsets = rng.normal(0., 2., zones)
+        self.cloud_cover = rng.uniform(0.5, 1., (days, zones))
+        self.temperatures = np.empty(zones)
+        self.light_intensities = np.empty(zones)
+
+    def __call__(self, minute):
+        day, minute_of_day = divmod(minute, MINUTES_PER_DAY)
+        hour = minute_of_day / 60
+        temperature = self.mean_temperature + self.temperature_amplitude * math.sin(2 * math.pi * (hour - 9) / 24)
+        np.add(self.temperature_offsets, temperature, out=self.temperatures)
+        sun = max(0., math.sin(2 * math.pi * (hour - 6) / 24))
+        np.multiply(self.cloud_cover[day % self.cloud_cover.shape[0]], self.peak_light * sun,
+                    out=self.light_intensities)
+        return self.temperatures, self.light_intensities
+
+
+class RecordedWeather(object):
+    """Weather replayed from minute-resolution recordings.
+
+    temperatures and light_intensities have shape (minutes,) for one climate
+    shared by every zone or (minutes, zones); memory-mapped arrays work. The
+    recording repeats when the run is longer.
+    """
+
+    def __init__(self, temperatures, light_intensities, zones):
+        if np.shape(temperatures) != np.shape(light_intensities):
+            raise ValueError("temperatures and light_intensities must have the same shape")
+        self.recorded = (temperatures, light_intensities)
+        self.zones = zones
+
+    def __call__(self, minute):
+        temperatures, light_intensities = self.recorded
+        row = minute % len(temperatures)
+        return (np.broadcast_to(np.asarray(temperatures[row], dtype=float), (self.zones,)),
+                np.broadcast_to(np.asarray(light_intensities[row], dtype=float), (self.zones,)))
+
+
+class GreenhouseSimulation(object):
+    """Soil moisture of many zones under a controller, minute by minute.
+
+    A zone holds `capacity_liters` of water at 100% moisture. It loses
+    evapotranspiration, which grows with PAR and temperature, reaches
+    `peak_et_mm_h` over `area_m2` at 1000 µmol/m²/s and 30 °C, and shrinks
+    as the soil dries below 30%. Above `field_capacity` percent, a fraction
+    `drainage_rate` of the excess drains away every minute.
+
+    `evaluate` is any function with the signature and result of
+    FuzzyLogic.evaluate_batch (a CompiledController's, or a
+    ParallelEvaluator's evaluate); the default is FuzzyLogic's. Its `output`
+    in m³/s is the flow applied until the next control step, and zones
+    where no rule fired are not watered. Bind a tracer with
+    functools.partial to time the controller.
+    """
+
+    def __init__(self, zones, weather, initial_moisture=50., capacity_liters=1000., area_m2=10.,
+                 peak_et_mm_h=0.5, field_capacity=80., drainage_rate=0.01, control_interval=5, evaluate=None):
+        if control_interval < 1:
+            raise ValueError("control_interval must be at least one minute")
+        self.zones = zones
+        self.weather = weather
+        self.capacity_liters = capacity_liters
+        self.field_capacity = field_capacity
+        self.drainage_rate = drainage_rate
+        self.control_interval = control_interval
+        self.evaluate = evaluate if evaluate is not None else FuzzyLogic.evaluate_batch
+        # Liters per minute per (°C + 17.8) and µmol/m²/s; 1 mm over 1 m² is 1 liter
+        self.et_scale = area_m2 * peak_et_mm_h / 60 / (30 + 17.8) / 1000
+        self.moisture = np.empty(zones)
+        self.moisture[:] = initial_moisture
+        self.minute = 0
+
+    def run(self, minutes):
+        """Advance every zone by `minutes` and return a summary dict.
+
+        water_liters, evapotranspiration_liters and drainage_liters are per
+        zone; daily_water_liters is (days, zones) counting from this run's
+        first minute; minutes_in_class is (zones, 4) in MOISTURE_CLASSES
+        order; moisture is the final state.
+        """
+        zones, moisture = self.zones, self.moisture
+        to_percent = 100. / self.capacity_liters
+        flow = np.zeros(zones)
+        et = np.empty(zones)
+        stress = np.empty(zones)
+        excess = np.empty(zones)
+        water = np.zeros(zones)
+        evapotranspiration = np.zeros(zones)
+        drainage = np.zeros(zones)
+        daily_water = np.zeros((-(-minutes // MINUTES_PER_DAY), zones))
+        minutes_below = np.zeros((len(MOISTURE_BOUNDS), zones), dtype=np.int64)
+        controller_calls = 0
+
+        for step in range(minutes):
+            temperatures, light_intensities = self.weather(self.minute)
+            if self.minute % self.control_interval == 0:
+                result = self.evaluate(temperatures, moisture, light_intensities)
+                # m³/s to liters per minute
+                np.multiply(result['output'], 60000., out=flow)
+                np.copyto(flow, 0., where=~result['rule_fired'])
+                controller_calls += 1
+
+            np.add(temperatures, 17.8, out=et)
+            np.maximum(et, 0., out=et)
+            et *= light_intensities
+            et *= self.et_scale
+            np.multiply(moisture, 1 / 30., out=stress)
+            np.minimum(stress, 1., out=stress)
+            et *= stress
+
+            np.subtract(flow, et, out=excess)
+            excess *= to_percent
+            moisture += excess
+            np.subtract(moisture, self.field_capacity, out=excess)
+            np.maximum(excess, 0., out=excess)
+            excess *= self.drainage_rate
+            moisture -= excess
+            # What a full bucket cannot hold runs off with the drainage
+            np.subtract(moisture, 100., out=stress)
+            np.maximum(stress, 0., out=stress)
+            excess += stress
+            np.clip(moisture, 0., 100., out=moisture)
+
+            water += flow
+            daily_water[step // MINUTES_PER_DAY] += flow
+            evapotranspiration += et
+            excess *= self.capacity_liters / 100.
+            drainage += excess
+            for below, bound in zip(minutes_below, MOISTURE_BOUNDS):
+                below += moisture < bound
+            self.minute += 1
+
+        minutes_in_class = np.empty((zones, len(MOISTURE_CLASSES)), dtype=np.int64)
+        minutes_in_class[:, 0] = minutes_below[0]
+        minutes_in_class[:, 1:-1] = (minutes_below[1:] - minutes_below[:-1]).T
+        minutes_in_class[:, -1] = minutes - minutes_below[-1]
+        return {
+            'water_liters': water,
+            'daily_water_liters': daily_water,
+            'evapotranspiration_liters': evapotranspiration,
+            'drainage_liters': drainage,
+            'minutes_in_class': minutes_in_class,
+            'moisture': moisture.copy(),
+            'controller_calls': controller_calls
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate soil moisture of many zones under the controller")
+    parser.add_argument('--zones', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--control-interval', type=int, default=5, help="minutes between controller evaluations")
+    parser.add_argument('--initial-moisture', type=float, default=50.)
+    parser.add_argument('--method', default='average_maximum', help="defuzzification method")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    def evaluate(temperatures, soil_moistures, light_intensities):
+        return FuzzyLogic.evaluate_batch(temperatures, soil_moistures, light_intensities,
+                                         defuzzification_method=args.method)
+
+    simulation = GreenhouseSimulation(args.zones, DiurnalWeather(args.zones, args.days, seed=args.seed),
+                                      initial_moisture=args.initial_moisture,
+                                      control_interval=args.control_interval, evaluate=evaluate)
+    start = time.perf_counter()
+    summary = simulation.run(args.days * MINUTES_PER_DAY)
+    seconds = time.perf_counter() - start
+
+    print("{} zones x {} days in {:.2f} s ({} controller batches)".format(
+        args.zones, args.days, seconds, summary['controller_calls']))
+    print("water per zone: {:.1f} L mean, {:.1f} L max".format(summary['water_liters'].mean(),
+                                                                summary['water_liters'].max()))
+    print("evapotranspiration {:.1f} L, drainage {:.1f} L per zone".format(
+        summary['evapotranspiration_liters'].mean(), summary['drainage_liters'].mean()))
+    shares = summary['minutes_in_class'].mean(axis=0) / (args.days * MINUTES_PER_DAY)
+    print("time in class: " + ", ".join("{} {:.1%}".format(name, share)
+                                         for name, share in zip(MOISTURE_CLASSES, shares)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+import functools
+import operator
+import threading
+
+import numpy as np
+
+from algorithm.controller_config import config_hash
+from algorithm.fuzzy_logic import FuzzyLogic
+from algorithm.visualizer import LIGHT_INTENSITY, SOIL_MOISTURE, TEMPERATURE, WATERING_SPEED
+
+
+def skfuzzy_variable(name, spec, resolution=0.01):
+    """skfuzzy spec of a plotted variable: its universe sampled every `resolution` and its terms."""
+    low, high = spec['universe']
+    return {
+        'name': name,
+        'universe': [low, high, int(round((high - low) / resolution)) + 1],
+        'terms': [[term, list(values['abcd'])] for term, values in spec['terms'].items()]
+    }
+
+
+# The skfuzzy version of the FuzzyLogic controller, built from the same
+# config through the visualizer specs. Universes are given as [start, stop,
+# num] for np.linspace, which keeps the shoulders' end on the last sample,
+# and terms as trapmf parameters; the rules come from FuzzyLogic.RULES_SET.
+SKFUZZY_CONFIG = {
+    'antecedents': [skfuzzy_variable('Temperature', TEMPERATURE), skfuzzy_variable('Soil Moisture', SOIL_MOISTURE),
+                    skfuzzy_variable('Light Intensity', LIGHT_INTENSITY)],
+    'consequent': skfuzzy_variable('Watering Speed', WATERING_SPEED),
+    'rules': sorted(FuzzyLogic.RULES_SET.items())
+}
+
+
+class SkfuzzySystem(object):
+    """The skfuzzy ControlSystem of a config: variables, terms and rules, built once.
+
+    controller() hands out one SkfuzzyController per defuzzification method,
+    all simulating this control system. skfuzzy keeps simulation state on the
+    shared variables, keyed by control system and inputs, and reads the
+    method from the shared Consequent, so `compute_lock` serializes the
+    steps that touch them across methods.
+    """
+
+    def __init__(self, config):
+        # skfuzzy is slow to import, so only controllers pay for it
+        import skfuzzy as fuzz
+        from skfuzzy import control as ctrl
+
+        antecedents = []
+        for variable in config['antecedents']:
+            antecedent = ctrl.Antecedent(np.linspace(*variable['universe']), variable['name'])
+            for term, abcd in variable['terms']:
+                antecedent[term] = fuzz.trapmf(antecedent.universe, abcd)
+            antecedents.append(antecedent)
+        variable = config['consequent']
+        self.consequent = ctrl.Consequent(np.linspace(*variable['universe']), variable['name'])
+        for term, abcd in variable['terms']:
+            self.consequent[term] = fuzz.trapmf(self.consequent.universe, abcd)
+
+        rules = []
+        for combination, consequent_term in config['rules']:
+            terms = [antecedent[spec['terms'][int(i)][0]]
+                     for antecedent, spec, i in zip(antecedents, config['antecedents'], combination)]
+            rules.append(ctrl.Rule(functools.reduce(operator.and_, terms),
+                                   self.consequent[variable['terms'][consequent_term][0]]))
+
+        self.antecedents = antecedents
+        self.control_system = ctrl.ControlSystem(rules)
+        self.compute_lock = threading.Lock()
+        self._controllers = {}
+        self._controllers_lock = threading.Lock()
+
+    def controller(self, defuzzify_method):
+        """The SkfuzzyController of this system for a defuzzification method, created on first use."""
+        with self._controllers_lock:
+            if defuzzify_method not in self._controllers:
+                self._controllers[defuzzify_method] = SkfuzzyController(self, defuzzify_method)
+            return self._controllers[defuzzify_method]
+
+
+class SkfuzzyController(object):
+    """A reusable simulation of an SkfuzzySystem for one defuzzification method.
+
+    The simulation keeps state between compute() and figure(), so callers
+    sharing a controller across threads should hold `lock` around both.
+    """
+
+    def __init__(self, system, defuzzify_method):
+        from skfuzzy import control as ctrl
+        self.system = system
+        self.defuzzify_method = defuzzify_method
+        self.antecedents = system.antecedents
+        self.consequent = system.consequent
+        self.simulation = ctrl.ControlSystemSimulation(system.control_system)
+        self.output = None
+        self.lock = threading.Lock()
+
+    def compute(self, *inputs):
+        """Crisp output for one reading; raises ValueError if no rule fires, like skfuzzy."""
+        from skfuzzy.control.controlsystem import CrispValueCalculator
+        with self.system.compute_lock:
+            for antecedent, value in zip(self.antecedents, inputs):
+                self.simulation.input[antecedent.label] = value
+            self.consequent.defuzzify_method = self.defuzzify_method
+            self.simulation.compute()
+            # The rule activations are the same for every method, but a run
+            # cached by another method's simulation carries its crisp output
+            self.output = CrispValueCalculator(self.consequent, self.simulation).defuzz()
+        return self.output
+
+    def output_memberships(self):
+        """Activation of every output term for the last compute(), in config order."""
+        return [float(term.membership_value[self.simulation]) for term in self.consequent.terms.values()]
+
+    def figure(self):
+        """Plot of the output variable for the last compute()."""
+        from skfuzzy.control.visualization import FuzzyVariableVisualizer
+        with self.system.compute_lock:
+            # The plot marks the crisp output stored on the shared Consequent
+            self.consequent.output[self.simulation] = self.output
+            fig, ax = FuzzyVariableVisualizer(self.consequent).view(sim=self.simulation)
+        return fig
+
+
+_systems = {}
+_systems_lock = threading.Lock()
+
+
+def get_controller(defuzzify_method='centroid', config=None):
+    """Process-wide SkfuzzyController for a config and defuzzification method.
+
+    The control system is built once per config, cached by the config hash,
+    and every method gets its own simulation of it. Editing the membership
+    functions or rules yields a new system while reruns reuse the old one.
+    """
+    config = config if config is not None else SKFUZZY_CONFIG
+    key = config_hash(config)
+    with _systems_lock:
+        if key not in _systems:
+            _systems[key] = SkfuzzySystem(config)
+        system = _systems[key]
+    return system.controller(defuzzify_method)
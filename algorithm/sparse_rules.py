@@ -0,0 +1,208 @@
+"""Rule evaluation that only touches the rules a reading can fire.
+
+Adjacent terms of an input overlap on one ramp at most, so a reading has at
+most two non-zero terms per input: one on a plateau, two on a ramp. Which
+ones follows from a binary search over the input's sorted breakpoints, and
+only the rules built from those terms can fire, at most 2 ** inputs of
+them (8 for FuzzyLogic's 27 rules):
+
+    evaluator = SparseRuleEvaluator()
+    evaluator.evaluate(27, 48, 723)
+    evaluator.evaluate_batch(temperatures, soil_moistures, light_intensities)
+
+The work per reading depends on the number of inputs, not on the number of
+terms or rules, which is what matters once a controller grows more terms or
+inputs such as humidity or wind. Results are identical to the
+CompiledController it is built from, and so to FuzzyLogic for the default
+config.
+"""
+import itertools
+
+import numpy as np
+
+from algorithm import defuzzification
+from algorithm.controller_config import compile_config, partition_breakpoints
+from algorithm.zone_controller import segment_of, segment_terms
+
+
+class SparseRuleEvaluator(object):
+    """Evaluate a CompiledController through its active terms only.
+
+    The controller (compile_config() by default) needs terms laid out as in
+    partition_breakpoints(). evaluate() runs one reading on plain floats,
+    evaluate_batch() runs arrays with the same active-rule scheme and returns
+    the controller's dict, except that the input memberships are replaced by
+    'active_terms_of_<name>' and 'active_membership_values_of_<name>', both
+    (rows, 2): the lower and upper active term of each reading and their
+    membership values. Both are the same term on a plateau.
+    """
+
+    def __init__(self, controller=None):
+        controller = controller if controller is not None else compile_config()
+        self.controller = controller
+        self.breakpoints = tuple(partition_breakpoints(terms, name)
+                                 for terms, name in zip(controller.input_terms, controller.input_names))
+        # Per input and term: (scale, offset) of the rising and of the falling
+        # edge, the same divisions as CompiledController._fuzzify; None for a shoulder
+        self.rises = tuple(tuple((1 / (b - a), a / (b - a)) if b > a else None for a, b, c, d in terms.tolist())
+                           for terms in controller.input_terms)
+        self.falls = tuple(tuple((-1 / (d - c), d / (d - c)) if d > c else None for a, b, c, d in terms.tolist())
+                           for terms in controller.input_terms)
+        # The same as arrays indexed by term for evaluate_batch: rise scale,
+        # rise offset negated, fall scale, fall offset. A shoulder's edge is 0 * value + 1
+        edge_arrays = []
+        for rises, falls in zip(self.rises, self.falls):
+            rises = [(scale, -offset) for scale, offset in (rise or (0., -1.) for rise in rises)]
+            falls = [fall or (0., 1.) for fall in falls]
+            edge_arrays.append(tuple(np.array(column) for column in zip(*rises)) +
+                               tuple(np.array(column) for column in zip(*falls)))
+        self._edge_arrays = tuple(edge_arrays)
+        # Terms that can be non-zero in every segment between breakpoints
+        self.segment_terms = tuple(tuple(tuple(segment_terms(segment)) for segment in range(len(breakpoints) + 1))
+                                   for breakpoints in self.breakpoints)
+        self.rules = dict(controller.rules)
+        self.output_terms = [tuple(term) for term in controller.output_terms.tolist()]
+        # Rule tensor flattened, with a spare output term for combinations without a rule
+        consequents = controller.rule_consequents.ravel()
+        self._rule_outputs = np.where(consequents >= 0, consequents, len(self.output_terms))
+        self._rule_strides = tuple(int(np.prod(controller.rule_consequents.shape[i + 1:]))
+                                   for i in range(len(self.breakpoints)))
+
+    def active_terms(self, index, value):
+        """[(term, membership)] of the one or two terms of input `index` that can be non-zero at value."""
+        terms = self.segment_terms[index][segment_of(value, self.breakpoints[index])]
+        if value != value:
+            # NaN readings take the last term, like FuzzyLogic
+            return [(terms[-1], 1.)]
+        return [(term, self._membership(index, term, value)) for term in terms]
+
+    def _membership(self, index, term, value):
+        membership = 1.
+        rise, fall = self.rises[index][term], self.falls[index][term]
+        if rise is not None:
+            membership = min(membership, min(max(value * rise[0] - rise[1], 0.), 1.))
+        if fall is not None:
+            membership = min(membership, min(max(value * fall[0] + fall[1], 0.), 1.))
+        return membership
+
+    def candidate_rules(self, *inputs):
+        """[(terms, consequent, strength)] of the rules whose terms are all active for one reading."""
+        if len(inputs) != len(self.breakpoints):
+            raise ValueError("Expected {} inputs ({})".format(len(self.breakpoints),
+                                                             ', '.join(self.controller.input_names)))
+        active = [self.active_terms(index, value) for index, value in enumerate(inputs)]
+        candidates = []
+        for combination in itertools.product(*active):
+            key = tuple(term for term, membership in combination)
+            consequent = self.rules.get(key)
+            if consequent is not None:
+                candidates.append((key, consequent, min(membership for term, membership in combination)))
+        return candidates
+
+    def infer(self, *inputs):
+        """Output term memberships of one reading: max over the candidate rules of min over their terms."""
+        memberships = [0.] * len(self.output_terms)
+        for key, consequent, strength in self.candidate_rules(*inputs):
+            if strength > memberships[consequent]:
+                memberships[consequent] = strength
+        return memberships
+
+    def evaluate(self, *inputs, defuzzification_method='average_maximum'):
+        """Crisp output of one reading, computed on floats without arrays for 'average_maximum'."""
+        memberships = self.infer(*inputs)
+        if defuzzification_method != 'average_maximum' or not self.controller.ordered_outputs:
+            return float(defuzzification.defuzzify(memberships, self.controller.output_terms, defuzzification_method))
+        # Extremes of maximum as in defuzzification.extremes_of_maximum: the
+        # first and last terms at the height hold them
+        height = max(memberships)
+        active = [q for q, membership in enumerate(memberships) if membership == height]
+        a, b = self.output_terms[active[0]][:2]
+        c, d = self.output_terms[active[-1]][2:]
+        return ((a + height * (b - a)) + (d - height * (d - c))) / 2
+
+    def evaluate_batch(self, *inputs, defuzzification_method='average_maximum'):
+        """Evaluate one array per input; see the class docstring."""
+        controller = self.controller
+        if len(inputs) != len(self.breakpoints):
+            raise ValueError("Expected {} input arrays ({})".format(len(self.breakpoints),
+                                                                   ', '.join(controller.input_names)))
+        inputs = [np.asarray(values, dtype=float).ravel() for values in inputs]
+        rows = inputs[0].shape[0]
+        if any(values.shape[0] != rows for values in inputs):
+            raise ValueError("{} must have the same length".format(', '.join(controller.input_names)))
+
+        result = {}
+        active_terms, active_memberships = [], []
+        for index, (values, name) in enumerate(zip(inputs, controller.input_names)):
+            terms, memberships = self._active_terms_batch(index, values)
+            active_terms.append(terms)
+            active_memberships.append(memberships)
+            result['active_terms_of_' + name] = terms.T
+            result['active_membership_values_of_' + name] = memberships.T
+
+        # Every combination of a lower or upper active term per input, so
+        # 2 ** inputs candidate rules per reading whatever the rule count.
+        # Each one's strength is max-scattered into row (output term, reading)
+        # of a flat array; within a combination every reading has one target.
+        n_outputs = len(self.output_terms)
+        aggregated = np.zeros((n_outputs + 1, rows))
+        flat = aggregated.reshape(-1)
+        offsets = [terms * stride for terms, stride in zip(active_terms, self._rule_strides)]
+        row_index = np.arange(rows)
+        rule = np.empty(rows, dtype=np.intp)
+        strength = np.empty(rows)
+        for corner in itertools.product((0, 1), repeat=len(inputs)):
+            rule[:] = offsets[0][corner[0]]
+            strength[:] = active_memberships[0][corner[0]]
+            for offset, memberships, side in zip(offsets[1:], active_memberships[1:], corner[1:]):
+                rule += offset[side]
+                np.minimum(strength, memberships[side], out=strength)
+            target = self._rule_outputs.take(rule)
+            target *= rows
+            target += row_index
+            current = flat.take(target)
+            np.maximum(current, strength, out=current)
+            flat[target] = current
+        # Column-major like the controller's (rows, terms) memberships
+        mu_output = aggregated[:n_outputs].T
+
+        max1, max2 = defuzzification.extremes_of_maximum(mu_output, controller.output_terms)
+        if defuzzification_method == 'average_maximum':
+            crisp_value = (max1 + max2) / 2
+        else:
+            crisp_value = defuzzification.defuzzify_batch(mu_output, controller.output_terms, defuzzification_method)
+        result.update({
+            'membership_values_of_' + controller.output_name: mu_output,
+            'rule_fired': mu_output.max(axis=1) > 0,
+            'max1': max1,
+            'max2': max2,
+            'crisp_value': crisp_value,
+            'output': crisp_value / 60000
+        })
+        return result
+
+    def _active_terms_batch(self, index, values):
+        # np.searchsorted(side='right') is bisect_right, segment_of's search,
+        # and also puts NaN past the last breakpoint
+        segments = np.searchsorted(np.asarray(self.breakpoints[index]), values, side='right')
+        terms = np.empty((2, values.shape[0]), dtype=np.intp)
+        np.floor_divide(segments, 2, out=terms[0])
+        segments += 1
+        np.floor_divide(segments, 2, out=terms[1])
+        memberships = np.empty(terms.shape)
+        edge = np.empty(values.shape[0])
+        rise_scale, rise_offset, fall_scale, fall_offset = self._edge_arrays[index]
+        # The min of the clipped edges is the clipped min of the edges
+        with np.errstate(invalid='ignore'):
+            for term, membership in zip(terms, memberships):
+                np.multiply(values, rise_scale.take(term), out=membership)
+                membership += rise_offset.take(term)
+                np.multiply(values, fall_scale.take(term), out=edge)
+                edge += fall_offset.take(term)
+                np.minimum(membership, edge, out=membership)
+                np.maximum(membership, 0, out=membership)
+                np.minimum(membership, 1, out=membership)
+        # NaN readings are on the last term, infinite ones on a shoulder: all
+        # are 1 there, also where a shoulder's inf * 0 gave NaN above
+        memberships[:, ~np.isfinite(values)] = 1
+        return terms, memberships
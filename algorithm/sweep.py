@@ -0,0 +1,190 @@
+"""Control surface of FuzzyLogic over dense 2-D or 3-D input grids.
+
+    python -m algorithm.sweep --temperature -20 50 701 --soil-moisture 0 100 1001 \\
+        --light-intensity 500 --output sweep --figure sweep.png
+
+An input given as LOW HIGH COUNT is swept over COUNT evenly spaced values, a
+single value holds it fixed. The grid is evaluated in tiles of `tile_rows`
+points, and with --output every array is a memory-mapped .npy file in that
+directory, so 10^7+ points need no more memory than one tile.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from algorithm.fuzzy_logic import FuzzyLogic
+
+INPUTS = ('temperature', 'soil_moisture', 'light_intensity')
+LABELS = {'temperature': 'Temperature (°C)', 'soil_moisture': 'Soil Moisture (%)',
+          'light_intensity': 'PAR Light Intensity (µmol/m²/s)'}
+
+# Bit r of a fired_rules mask is RULE_KEYS[r], in the order of RULE_MASK
+RULE_INDICES = np.nonzero(FuzzyLogic.RULE_MASK)
+RULE_KEYS = [''.join(str(i) for i in key) for key in zip(*RULE_INDICES)]
+
+
+def fired_rules_mask(result):
+    """Bitmask of the rules with a non-zero strength, per reading of an evaluate_batch result."""
+    temperature = result['membership_values_of_temperature']
+    soil_moisture = result['membership_values_of_soil_moisture']
+    light_intensity = result['membership_values_of_light_intensity']
+    mask = np.zeros(temperature.shape[0], dtype=np.uint32)
+    strength = np.empty(temperature.shape[0])
+    # One rule at a time, so memory stays proportional to the readings
+    for bit, (a, b, c) in enumerate(zip(*RULE_INDICES)):
+        np.minimum(temperature[:, a], soil_moisture[:, b], out=strength)
+        np.minimum(strength, light_intensity[:, c], out=strength)
+        mask[strength > 0] |= np.uint32(1 << bit)
+    return mask
+
+
+def _empty(shape, dtype, directory, name):
+    if directory is None:
+        return np.empty(shape, dtype=dtype)
+    return np.lib.format.open_memmap(os.path.join(directory, name + '.npy'), mode='w+', dtype=dtype, shape=shape)
+
+
+def sweep(axes, fixed, tile_rows=262144, defuzzification_method='average_maximum', directory=None):
+    """Evaluate every point of a grid and return the control surface.
+
+    `axes` maps two or three of INPUTS to 1-D arrays of values and `fixed`
+    maps the others to a number. Returns a dict with 'axes', 'surface' (the
+    crisp value in liters/minute, NaN where no rule fired), one
+    'gradient_<input>' per swept input (liters/minute per input unit) and
+    'fired_rules' (RULE_KEYS bitmasks). All arrays have the grid shape, in
+    INPUTS order, and are memory-mapped files in `directory` when given.
+    """
+    swept = [name for name in INPUTS if name in axes]
+    if not 2 <= len(swept) <= 3:
+        raise ValueError("Sweep two or three of {}".format(', '.join(INPUTS)))
+    if set(axes) | set(fixed) != set(INPUTS) or set(axes) & set(fixed):
+        raise ValueError("Give every input either a sweep axis or a fixed value")
+    axes = {name: np.asarray(axes[name], dtype=float) for name in swept}
+    if any(values.ndim != 1 or values.shape[0] < 2 for values in axes.values()):
+        raise ValueError("Every axis needs at least two values")
+    shape = tuple(axes[name].shape[0] for name in swept)
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+
+    surface = _empty(shape, np.float64, directory, 'surface')
+    fired_rules = _empty(shape, np.uint32, directory, 'fired_rules')
+    flat_surface, flat_fired = surface.reshape(-1), fired_rules.reshape(-1)
+    strides = [int(np.prod(shape[i + 1:])) for i in range(len(shape))]
+    for start in range(0, surface.size, tile_rows):
+        index = np.arange(start, min(start + tile_rows, surface.size))
+        coordinates = {name: axes[name][(index // stride) % size]
+                       for name, stride, size in zip(swept, strides, shape)}
+        readings = [coordinates[name] if name in coordinates else np.full(index.shape[0], float(fixed[name]))
+                    for name in INPUTS]
+        result = FuzzyLogic.evaluate_batch(*readings, defuzzification_method=defuzzification_method)
+        flat_surface[start:start + index.shape[0]] = np.where(result['rule_fired'], result['crisp_value'], np.nan)
+        flat_fired[start:start + index.shape[0]] = fired_rules_mask(result)
+
+    summary = {'axes': axes, 'surface': surface, 'fired_rules': fired_rules}
+    for axis, name in enumerate(swept):
+        summary['gradient_' + name] = _empty(shape, np.float64, directory, 'gradient_' + name)
+    # np.gradient slab by slab along the first axis, with one neighbouring
+    # slice on each side so the slab edges get the same central differences
+    slab = max(1, tile_rows // max(1, strides[0]))
+    for start in range(0, shape[0], slab):
+        stop = min(start + slab, shape[0])
+        low, high = max(start - 1, 0), min(stop + 1, shape[0])
+        spacing = [axes[swept[0]][low:high]] + [axes[name] for name in swept[1:]]
+        gradients = np.gradient(np.asarray(surface[low:high]), *spacing)
+        for name, gradient in zip(swept, gradients):
+            summary['gradient_' + name][start:stop] = gradient[start - low:start - low + stop - start]
+    if directory is not None:
+        for name, values in axes.items():
+            np.save(os.path.join(directory, 'axis_' + name + '.npy'), values)
+        with open(os.path.join(directory, 'sweep.json'), 'w', encoding='utf-8') as file:
+            json.dump({'inputs': swept, 'fixed': {name: float(value) for name, value in fixed.items()},
+                       'shape': shape, 'defuzzification_method': defuzzification_method,
+                       'rule_keys': RULE_KEYS}, file, indent=2)
+        for array in (surface, fired_rules) + tuple(summary['gradient_' + name] for name in swept):
+            array.flush()
+    return summary
+
+
+def heatmap(summary, slices=4, max_pixels=1000):
+    """One matplotlib figure of the surface with the fired-rule region borders.
+
+    A 3-D sweep is shown as `slices` evenly spaced slices along its last
+    axis. Large grids are strided down to about `max_pixels` per side.
+    """
+    import matplotlib.pyplot as plt
+    names = list(summary['axes'])
+    surface, fired_rules = summary['surface'], summary['fired_rules']
+    if len(names) == 2:
+        panels = [(surface, fired_rules, None)]
+    else:
+        last = summary['axes'][names[2]]
+        panels = [(surface[..., k], fired_rules[..., k], '{} = {:.4g}'.format(LABELS[names[2]], last[k]))
+                  for k in np.linspace(0, last.shape[0] - 1, slices).round().astype(int)]
+    x, y = summary['axes'][names[1]], summary['axes'][names[0]]
+    step_y, step_x = max(1, y.shape[0] // max_pixels), max(1, x.shape[0] // max_pixels)
+
+    fig, axes = plt.subplots(1, len(panels), figsize=(5 * len(panels) + 1, 4.5), squeeze=False)
+    for ax, (values, regions, title) in zip(axes[0], panels):
+        values = np.asarray(values[::step_y, ::step_x])
+        regions = np.asarray(regions[::step_y, ::step_x])
+        image = ax.pcolormesh(x[::step_x], y[::step_y], values, shading='nearest', cmap='viridis', vmin=0, vmax=12)
+        # A fired-rule region ends where the mask changes between neighbours
+        border = np.zeros(regions.shape, dtype=bool)
+        border[1:, :] |= regions[1:, :] != regions[:-1, :]
+        border[:, 1:] |= regions[:, 1:] != regions[:, :-1]
+        ax.pcolormesh(x[::step_x], y[::step_y], np.ma.masked_where(~border, border), shading='nearest',
+                      cmap='gray_r', vmin=0, vmax=1, alpha=0.5)
+        ax.set_xlabel(LABELS[names[1]])
+        ax.set_ylabel(LABELS[names[0]])
+        if title is not None:
+            ax.set_title(title, fontsize='small')
+    fig.colorbar(image, ax=axes[0].tolist(), label='Watering Speed (liters/minute)')
+    return fig
+
+
+def _axis_or_value(values):
+    if len(values) == 1:
+        return None, values[0]
+    if len(values) != 3 or values[2] < 2 or values[2] != int(values[2]):
+        raise ValueError("Give an input as one value or as LOW HIGH COUNT")
+    return np.linspace(values[0], values[1], int(values[2])), None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep FuzzyLogic over an input grid")
+    for name in INPUTS:
+        parser.add_argument('--' + name.replace('_', '-'), nargs='+', type=float, required=True,
+                            metavar='VALUE', help="LOW HIGH COUNT to sweep, or one fixed value")
+    parser.add_argument('--output', metavar='DIRECTORY', help="write the arrays as .npy files here")
+    parser.add_argument('--figure', metavar='PATH', help="save the heatmap to PATH")
+    parser.add_argument('--tile-rows', type=int, default=262144)
+    parser.add_argument('--method', default='average_maximum', help="defuzzification method")
+    args = parser.parse_args(argv)
+
+    axes, fixed = {}, {}
+    for name in INPUTS:
+        axis, value = _axis_or_value(getattr(args, name))
+        if axis is not None:
+            axes[name] = axis
+        else:
+            fixed[name] = value
+    summary = sweep(axes, fixed, args.tile_rows, args.method, args.output)
+
+    # Slice by slice, so memory-mapped results are not read in whole
+    size = summary['surface'].size
+    fired = sum(np.count_nonzero(rules) for rules in summary['fired_rules'])
+    print("{} points, rules fired on {:.1%}".format(size, fired / size))
+    for name in axes:
+        steepest = max(np.nanmax(np.abs(gradient), initial=0.) for gradient in summary['gradient_' + name])
+        print("d speed / d {}: max |{:.4g}| liters/minute per unit".format(name, steepest))
+    if args.figure:
+        import matplotlib.pyplot as plt
+        fig = heatmap(summary)
+        fig.savefig(args.figure, dpi=150, bbox_inches='tight')
+        plt.close(fig)
+
+
+if __name__ == '__main__':
+    main()
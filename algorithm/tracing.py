@@ -0,0 +1,211 @@
+import bisect
+import collections
+import contextlib
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+class Tracer(object):
+    """Sink for the intermediate values of a FuzzyLogic evaluation.
+
+    FuzzyLogic calls record() once per stage with the stage name, the time the
+    stage took in seconds and the values it produced. Values are passed by
+    reference (NumPy arrays included), so sinks that keep them must copy.
+    The base class discards everything and is what FuzzyLogic uses by default.
+    """
+
+    def record(self, stage, elapsed, **values):
+        pass
+
+
+NULL_TRACER = Tracer()
+
+
+@contextlib.contextmanager
+def stage_timer(tracer, stage, **values):
+    """Record the duration of a with-block as one stage, e.g. around a plot or table."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.record(stage, time.perf_counter() - start, **values)
+
+
+class TeeTracer(Tracer):
+    """Forward every stage record to several tracers."""
+
+    def __init__(self, *tracers):
+        self.tracers = tracers
+
+    def record(self, stage, elapsed, **values):
+        for tracer in self.tracers:
+            tracer.record(stage, elapsed, **values)
+
+
+def _to_builtin(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class RingBufferTracer(Tracer):
+    """Keep the last `capacity` stage records in memory as plain dicts."""
+
+    def __init__(self, capacity=1024):
+        self.records = collections.deque(maxlen=capacity)
+
+    def record(self, stage, elapsed, **values):
+        entry = {'stage': stage, 'elapsed': elapsed}
+        for key, value in values.items():
+            entry[key] = _to_builtin(value)
+        self.records.append(entry)
+
+    def timings(self):
+        """Total elapsed seconds and call count per stage over the buffered records."""
+        totals = {}
+        for entry in self.records:
+            total, count = totals.get(entry['stage'], (0.0, 0))
+            totals[entry['stage']] = (total + entry['elapsed'], count + 1)
+        return totals
+
+    def clear(self):
+        self.records.clear()
+
+
+class JsonLinesTracer(Tracer):
+    """Write every stage record as one JSON object per line to a text stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def record(self, stage, elapsed, **values):
+        entry = {'stage': stage, 'elapsed': elapsed}
+        for key, value in values.items():
+            entry[key] = _to_builtin(value)
+        self.stream.write(json.dumps(entry) + "\n")
+
+
+class PrintTracer(Tracer):
+    """Print the stage values to stdout in the console format of the Streamlit pages."""
+
+    LABELS = {
+        'fuzzification_of_temperature': "Fuzzy Temperature",
+        'fuzzification_of_soil_moisture': "Fuzzy Soil Moisture",
+        'fuzzification_of_light_intensity': "Fuzzy PAR Light Intensity",
+        'fuzzy_inference': "The Fuzzy Value of Watering Speed"
+    }
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def record(self, stage, elapsed, **values):
+        stream = self.stream if self.stream is not None else sys.stdout
+        if stage in self.LABELS:
+            print(self.LABELS[stage], end=": ", file=stream)
+            print(values['membership_values'], file=stream)
+        elif stage == 'defuzzification_of_watering_speed':
+            print("The maximum head", end=": ", file=stream)
+            print(values['max1'], file=stream)
+            print("The maximum tail", end=": ", file=stream)
+            print(values['max2'], file=stream)
+            print("Average maximum", end=": ", file=stream)
+            print(values['crisp_value'], file=stream)
+            print("Convert to m3/s", end=": ", file=stream)
+            print("{:.10f}".format(values['output']), file=stream)
+            print("___________________________________________", file=stream)
+
+
+class MetricsTracer(Tracer):
+    """Aggregate stage timings and rule counters for monitoring.
+
+    Keeps a latency histogram per stage plus the number of rules fired and of
+    readings for which no rule fired, and renders them in the Prometheus text
+    exposition format. Thread-safe, so one instance can serve a whole process.
+    """
+
+    BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.)
+
+    def __init__(self, buckets=BUCKETS, prefix='watering'):
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # stage -> [count per bucket (last one is +Inf), seconds, calls, rows]
+            self.stages = {}
+            # name -> (help text, value)
+            self.gauges = {}
+            self.counters = {}
+            self.rules_fired = 0
+            self.readings = 0
+            self.readings_without_rule = 0
+
+    def record(self, stage, elapsed, **values):
+        with self.lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = [[0] * (len(self.buckets) + 1), 0., 0, 0]
+            entry[0][bisect.bisect_left(self.buckets, elapsed)] += 1
+            entry[1] += elapsed
+            entry[2] += 1
+            entry[3] += values.get('rows', 1)
+            self.rules_fired += values.get('rules_fired', 0)
+            if 'rule_fired' in values:
+                self.readings += 1
+                self.readings_without_rule += not values['rule_fired']
+            elif 'rows_fired' in values:
+                self.readings += values['rows']
+                self.readings_without_rule += values['rows'] - values['rows_fired']
+
+    def set_gauge(self, name, value, description=''):
+        """Set a gauge, exported as <prefix>_<name>."""
+        with self.lock:
+            self.gauges[name] = (description, value)
+
+    def increment(self, name, value=1, description=''):
+        """Add to a counter, exported as <prefix>_<name>_total."""
+        with self.lock:
+            self.counters[name] = (description, self.counters.get(name, ('', 0))[1] + value)
+
+    def prometheus(self):
+        """The metrics as Prometheus text, ready to serve on /metrics."""
+        name = self.prefix + '_stage_seconds'
+        lines = ['# HELP {} Time spent in each evaluation stage.'.format(name),
+                 '# TYPE {} histogram'.format(name)]
+        with self.lock:
+            for stage, (counts, seconds, calls, rows) in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('{}_bucket{{stage="{}",le="{}"}} {}'.format(name, stage, le, cumulative))
+                lines.append('{}_sum{{stage="{}"}} {!r}'.format(name, stage, seconds))
+                lines.append('{}_count{{stage="{}"}} {}'.format(name, stage, calls))
+            rows = [(stage, entry[3]) for stage, entry in sorted(self.stages.items())]
+            counters = [('rules_fired_total', "Rules fired with a non-zero strength.", self.rules_fired),
+                        ('readings_total', "Readings evaluated.", self.readings),
+                        ('readings_without_rule_total', "Readings for which no rule fired.",
+                         self.readings_without_rule)]
+            counters += [(name + '_total', description, value)
+                         for name, (description, value) in sorted(self.counters.items())]
+            gauges = sorted(self.gauges.items())
+        name = self.prefix + '_stage_rows_total'
+        lines += ['# HELP {} Readings processed by each stage.'.format(name), '# TYPE {} counter'.format(name)]
+        lines += ['{}{{stage="{}"}} {}'.format(name, stage, count) for stage, count in rows]
+        for suffix, description, value in counters:
+            name = self.prefix + '_' + suffix
+            lines += ['# HELP {} {}'.format(name, description), '# TYPE {} counter'.format(name),
+                      '{} {}'.format(name, value)]
+        for suffix, (description, value) in gauges:
+            name = self.prefix + '_' + suffix
+            lines += ['# HELP {} {}'.format(name, description), '# TYPE {} gauge'.format(name),
+                      '{} {}'.format(name, value)]
+        return '\n'.join(lines) + '\n'
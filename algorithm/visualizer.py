@@ -1,411 +1,170 @@
-import numpy as np
-import matplotlib.pyplot as plt
-
-class TemperatureVisualizer(object):
-
-    def __init__(self, membership_values, crisp_value):
-        self.membership_values = membership_values
-        self.crisp_value = crisp_value
-        self.universe = np.arange(-20, 50.01, 0.01)
-        self.terms = {
-            'Very cold': {
-                'mf': self.trapmf(self.universe, [-20, -20, 5, 10]),
-                'color': 'blue'
-            },
-            'Cold': {
-                'mf': self.trapmf(self.universe, [5, 10, 15, 20]),
-                'color': 'green'
-            },
-            'Warm': {
-                'mf': self.trapmf(self.universe, [15, 20, 25, 30]),
-                'color': 'orange'
-            },
-            'Hot': {
-                'mf': self.trapmf(self.universe, [25, 30, 51, 51]),
-                'color': 'red'
-            }
-        }
-        self.fig, self.ax = plt.subplots()
-        self.plots = {}
-
-    def plot(self):
-            # Formatting: limits
-            self.ax.set_ylim([0, 1.1])
-            self.ax.set_xlim([self.universe.min(),
-                            self.universe.max() + 4])
-
-            # Make the plots
-            for key, term in self.terms.items():
-                self.plots[key] = self.ax.plot(self.universe,
-                                            term['mf'],
-                                            label=key,
-                                            linewidth=1.5,
-                                            color=term['color'])
-
-            crisp_value_line = np.arange(0, self.membership_values.max(), 0.01)
-            membership_value_line = np.arange(self.universe.min(), self.crisp_value, 0.01)
-
-            self.plots['res'] = self.ax.plot(np.full(crisp_value_line.shape[0], self.crisp_value),
-                                            crisp_value_line,
-                                            ':',
-                                            color='black')
-
-            for i in range(self.membership_values.shape[0]):
-                if self.membership_values[i] > 0:
-                    self.plots[i] = self.ax.plot(membership_value_line,
-                                                    np.full(membership_value_line.shape[0], self.membership_values[i]),
-                                                    ':',
-                                                    color=list(self.terms.items())[i][1]['color'])
-
-            plt.yticks([round(j, 2) for j in self.membership_values if j > 0] + [round(j, 2) for j in np.arange(0, 1.2, 0.2).tolist()], [str(round(j, 2)) + "     " for j in self.membership_values if j > 0] + [round(j, 2) for j in np.arange(0, 1.2, 0.2).tolist()])
-
-            # Place legend in upper left
-            self.ax.legend(framealpha=0.5, loc='right')
-
-            # Turn off top/right axes
-            self.ax.spines['top'].set_visible(False)
-            self.ax.spines['right'].set_visible(False)
-            self.ax.get_xaxis().tick_bottom()
-            self.ax.get_yaxis().tick_left()
-
-            # Ticks outside the axes
-            self.ax.tick_params(direction='out')
+import functools
 
-            # Label the axes
-            self.ax.set_ylabel('Membership Value')
-            self.ax.set_xlabel('Temperature (°C)')
-
-            xtick = "\n" + str(round(self.crisp_value, 2))
-            plt.xticks([round(self.crisp_value, 2)] + [i for i in range(-20, 51, 10)], [xtick] + [i for i in range(-20, 51, 10)])
-
-            return self.fig, self.ax
-
-    def trimf(self, x, abc):
-            a, b, c = np.r_[abc]     # Zero-indexing in Python
-
-            y = np.zeros(len(x))
-
-            # Left side
-            if a != b:
-                idx = np.nonzero(np.logical_and(a < x, x < b))[0]
-                y[idx] = (x[idx] - a) / float(b - a)
-
-            # Right side
-            if b != c:
-                idx = np.nonzero(np.logical_and(b < x, x < c))[0]
-                y[idx] = (c - x[idx]) / float(c - b)
-
-            idx = np.nonzero(x == b)
-            y[idx] = 1
-            return y
-
-    def trapmf(self, x, abcd):
-            a, b, c, d = np.r_[abcd]
-            y = np.ones(len(x))
-
-            idx = np.nonzero(x <= b)[0]
-            y[idx] = self.trimf(x[idx], np.r_[a, b, b])
-
-            idx = np.nonzero(x >= c)[0]
-            y[idx] = self.trimf(x[idx], np.r_[c, c, d])
-
-            idx = np.nonzero(x < a)[0]
-            y[idx] = np.zeros(len(idx))
-
-            idx = np.nonzero(x > d)[0]
-            y[idx] = np.zeros(len(idx))
-
-            return y
-
-    
-class SoilMoistureVisualizer(object):
-    
-    def __init__(self, membership_values, crisp_value):
-        self.membership_values = membership_values
-        self.crisp_value = crisp_value
-        self.universe = np.arange(0, 100.01, 0.01)
-        self.terms = {
-            'Very dry': {
-                'mf': self.trapmf(self.universe, [0, 0, 25, 35]),
-                'color': 'red'
-            },
-            'Dry': {
-                'mf': self.trapmf(self.universe, [25, 35, 45, 55]),
-                'color': 'orange'
-            },
-            'Moist': {
-                'mf': self.trapmf(self.universe, [45, 55, 65, 75]),
-                'color': 'green'
-            },
-            'Very moist': {
-                'mf': self.trapmf(self.universe, [65, 75, 101, 101]),
-                'color': 'blue'
-            }
-        }
-        self.fig, self.ax = plt.subplots()
-        self.plots = {}
-
-    def plot(self):
-        # Formatting: limits
-        self.ax.set_ylim([0, 1.1])
-        self.ax.set_xlim([self.universe.min(),
-                          self.universe.max() + 4])
-
-        # Make the plots
-        for key, term in self.terms.items():
-
-            self.plots[key] = self.ax.plot(self.universe,
-                                           term['mf'],
-                                           label=key,
-                                           linewidth=1.5,
-                                           color=term['color'])
-
-        crisp_value_line = np.arange(0, self.membership_values.max(), 0.01)
-        membership_value_line = np.arange(self.universe.min(), self.crisp_value, 0.01)
-
-        self.plots['res'] = self.ax.plot(np.full(crisp_value_line.shape[0], self.crisp_value),
-                                        crisp_value_line,
-                                        ':',
-                                        color='black')
-        
-        for i in range(self.membership_values.shape[0]):
-            if self.membership_values[i] > 0:
-                self.plots[i] = self.ax.plot(membership_value_line,
-                                                 np.full(membership_value_line.shape[0], self.membership_values[i]),
-                                                 ':',
-                                                 color=list(self.terms.items())[i][1]['color'])
-
-        plt.yticks([round(j, 2) for j in self.membership_values if j > 0] + [round(j, 2) for j in np.arange(0, 1.2, 0.2).tolist()], [str(round(j, 2)) + "     " for j in self.membership_values if j > 0] + [round(j, 2) for j in np.arange(0, 1.2, 0.2).tolist()])
-
-        # Place legend in upper left
-        self.ax.legend(framealpha=0.5, loc='right')
-
-        # Turn off top/right axes
-        self.ax.spines['top'].set_visible(False)
-        self.ax.spines['right'].set_visible(False)
-        self.ax.get_xaxis().tick_bottom()
-        self.ax.get_yaxis().tick_left()
-
-        # Ticks outside the axes
-        self.ax.tick_params(direction='out')
-
-        # Label the axes
-        self.ax.set_ylabel('Membership Value')
-        self.ax.set_xlabel('Soil Moisture (%)')
-
-        xtick = "\n" + str(round(self.crisp_value, 2))
-        plt.xticks([round(self.crisp_value, 2)] + [i for i in range(0, 101, 10)], [xtick] + [i for i in range(0, 101, 10)])
-
-        return self.fig, self.ax
-
-    def trimf(self, x, abc):
-        a, b, c = np.r_[abc]     # Zero-indexing in Python
-
-        y = np.zeros(len(x))
-
-        # Left side
-        if a != b:
-            idx = np.nonzero(np.logical_and(a < x, x < b))[0]
-            y[idx] = (x[idx] - a) / float(b - a)
-
-        # Right side
-        if b != c:
-            idx = np.nonzero(np.logical_and(b < x, x < c))[0]
-            y[idx] = (c - x[idx]) / float(c - b)
-
-        idx = np.nonzero(x == b)
-        y[idx] = 1
-        return y
-
-    def trapmf(self, x, abcd):
-        a, b, c, d = np.r_[abcd]
-        y = np.ones(len(x))
-
-        idx = np.nonzero(x <= b)[0]
-        y[idx] = self.trimf(x[idx], np.r_[a, b, b])
-
-        idx = np.nonzero(x >= c)[0]
-        y[idx] = self.trimf(x[idx], np.r_[c, c, d])
-
-        idx = np.nonzero(x < a)[0]
-        y[idx] = np.zeros(len(idx))
-
-        idx = np.nonzero(x > d)[0]
-        y[idx] = np.zeros(len(idx))
-
-        return y
-    
-class LightIntensityVisualizer(object):
-    
-    def __init__(self, membership_values, crisp_value):
-        self.membership_values = membership_values
-        self.crisp_value = crisp_value
-        self.universe = np.arange(0, 1000.01, 0.01)
-        self.terms = {
-            'Weak': {
-                'mf': self.trapmf(self.universe, [0, 0, 300, 400]),
-                'color': 'blue'
-            },
-            'Medium': {
-                'mf': self.trapmf(self.universe, [300, 400, 700, 800]),
-                'color': 'orange'
-            },
-            'Strong': {
-                'mf': self.trapmf(self.universe, [700, 800, 1001, 1001]),
-                'color': 'red'
-            }
-        }
-        self.fig, self.ax = plt.subplots()
-        self.plots = {}
-
-    def plot(self):
-        # Formatting: limits
-        self.ax.set_ylim([0, 1.1])
-        self.ax.set_xlim([self.universe.min(),
-                          self.universe.max() + 40])
-
-        # Make the plots
-        for key, term in self.terms.items():
-
-            self.plots[key] = self.ax.plot(self.universe,
-                                           term['mf'],
-                                           label=key,
-                                           linewidth=1.5,
-                                           color=term['color'])
-
-        crisp_value_line = np.arange(0, self.membership_values.max(), 0.01)
-        membership_value_line = np.arange(self.universe.min(), self.crisp_value, 0.01)
-
-        self.plots['res'] = self.ax.plot(np.full(crisp_value_line.shape[0], self.crisp_value),
-                                        crisp_value_line,
-                                        ':',
-                                        color='black')
-        
-        for i in range(self.membership_values.shape[0]):
-            if self.membership_values[i] > 0:
-                self.plots[i] = self.ax.plot(membership_value_line,
-                                                 np.full(membership_value_line.shape[0], self.membership_values[i]),
-                                                 ':',
-                                                 color=list(self.terms.items())[i][1]['color'])
-
-        plt.yticks([round(j, 2) for j in self.membership_values if j > 0] + [round(j, 2) for j in np.arange(0, 1.2, 0.2).tolist()], [str(round(j, 2)) + "     " for j in self.membership_values if j > 0] + [round(j, 2) for j in np.arange(0, 1.2, 0.2).tolist()])
-
-        # Place legend in upper left
-        self.ax.legend(framealpha=0.5, loc='right')
-
-        # Turn off top/right axes
-        self.ax.spines['top'].set_visible(False)
-        self.ax.spines['right'].set_visible(False)
-        self.ax.get_xaxis().tick_bottom()
-        self.ax.get_yaxis().tick_left()
-
-        # Ticks outside the axes
-        self.ax.tick_params(direction='out')
-
-        # Label the axes
-        self.ax.set_ylabel('Membership Value')
-        self.ax.set_xlabel('PAR Light Intensity (µmol/m²/s)')
-
-        xtick = "\n" + str(round(self.crisp_value, 2))
-        plt.xticks([round(self.crisp_value, 2)] + [i for i in range(0, 1100, 100)], [xtick] + [i for i in range(0, 1100, 100)])
-
-        return self.fig, self.ax
-
-    def trimf(self, x, abc):
-        a, b, c = np.r_[abc]     # Zero-indexing in Python
-
-        y = np.zeros(len(x))
-
-        # Left side
-        if a != b:
-            idx = np.nonzero(np.logical_and(a < x, x < b))[0]
-            y[idx] = (x[idx] - a) / float(b - a)
-
-        # Right side
-        if b != c:
-            idx = np.nonzero(np.logical_and(b < x, x < c))[0]
-            y[idx] = (c - x[idx]) / float(c - b)
-
-        idx = np.nonzero(x == b)
-        y[idx] = 1
-        return y
-
-    def trapmf(self, x, abcd):
-        a, b, c, d = np.r_[abcd]
-        y = np.ones(len(x))
-
-        idx = np.nonzero(x <= b)[0]
-        y[idx] = self.trimf(x[idx], np.r_[a, b, b])
-
-        idx = np.nonzero(x >= c)[0]
-        y[idx] = self.trimf(x[idx], np.r_[c, c, d])
-
-        idx = np.nonzero(x < a)[0]
-        y[idx] = np.zeros(len(idx))
-
-        idx = np.nonzero(x > d)[0]
-        y[idx] = np.zeros(len(idx))
-
-        return y
+import numpy as np
 
-    
-class WateringSpeedVisualizer(object):
-    
-    def __init__(self, membership_values, crisp_value):
+from algorithm.controller_config import DEFAULT_CONFIG
+
+
+def membership_curve(x, abcd):
+    """Trapezoidal membership of x as one piecewise-linear np.interp.
+
+    A shoulder (a == b or c == d) is a vertical edge, so the curve is 1 at
+    that breakpoint and 0 beyond it, like skfuzzy's trapmf.
+    """
+    a, b, c, d = abcd
+    xp, fp = [], []
+    if a != b:
+        xp.append(a)
+        fp.append(0.)
+    xp += [b, c]
+    fp += [1., 1.]
+    if c != d:
+        xp.append(d)
+        fp.append(0.)
+    return np.interp(x, xp, fp, left=0., right=0.)
+
+
+# Shared by every visualizer instance and session, LRU-bounded and read-only
+@functools.lru_cache(maxsize=64)
+def term_vertices(abcd, low, high):
+    """Polyline of a trapezoid over [low, high]: its corners plus the two ends.
+
+    Trapezoids are piecewise linear, so these few points draw exactly the same
+    line as sampling the whole universe. The arrays are shared, hence read-only.
+    """
+    x = [low]
+    y = [membership_curve(low, abcd)]
+    for vertex, membership in zip(abcd, (0., 1., 1., 0.)):
+        if low < vertex < high:
+            x.append(vertex)
+            y.append(membership)
+    x.append(high)
+    y.append(membership_curve(high, abcd))
+    x, y = np.array(x, dtype=float), np.array(y, dtype=float)
+    x.setflags(write=False)
+    y.setflags(write=False)
+    return x, y
+
+
+def variable_spec(variable, label, padding, xticks, names, colors, full_width_levels=False):
+    """Plot spec of a config variable: its universe and terms with display names and colors."""
+    spec = {
+        'label': label,
+        'universe': tuple(variable['universe']),
+        'padding': padding,
+        'xticks': xticks,
+        'terms': {name: {'abcd': tuple(abcd), 'color': color}
+                  for name, abcd, color in zip(names, variable['terms'].values(), colors)}
+    }
+    if full_width_levels:
+        # The output memberships are clipping levels, drawn across the whole universe
+        spec['full_width_levels'] = True
+    return spec
+
+
+# Everything that differs between the plotted variables; universes and terms
+# come from the controller config
+TEMPERATURE = variable_spec(DEFAULT_CONFIG['inputs'][0], 'Temperature (°C)', 4, range(-20, 51, 10),
+                            ('Very cold', 'Cold', 'Warm', 'Hot'), ('blue', 'green', 'orange', 'red'))
+
+SOIL_MOISTURE = variable_spec(DEFAULT_CONFIG['inputs'][1], 'Soil Moisture (%)', 4, range(0, 101, 10),
+                              ('Very dry', 'Dry', 'Moist', 'Very moist'), ('red', 'orange', 'green', 'blue'))
+
+LIGHT_INTENSITY = variable_spec(DEFAULT_CONFIG['inputs'][2], 'PAR Light Intensity (µmol/m²/s)', 40,
+                                range(0, 1100, 100), ('Weak', 'Medium', 'Strong'), ('blue', 'orange', 'red'))
+
+WATERING_SPEED = variable_spec(DEFAULT_CONFIG['output'], 'Watering Speed (liters/minute)', 1, range(0, 14, 2),
+                               ('Very Slow', 'Slow', 'Fast', 'Very Fast'), ('red', 'orange', 'green', 'blue'),
+                               full_width_levels=True)
+
+
+def vega_lite_spec(spec, membership_values, crisp_value):
+    """The VariableVisualizer plot as a Vega-Lite chart, drawn by the browser.
+
+    Only the trapezoid vertices, the membership levels and the input travel
+    to the client, about 2 KB against 50 KB for the PNG.
+    """
+    low, high = spec['universe']
+    names = list(spec['terms'])
+    colors = [term['color'] for term in spec['terms'].values()]
+    membership_values = [float(value) for value in membership_values]
+
+    vertices = []
+    for name, term in spec['terms'].items():
+        x, y = term_vertices(tuple(term['abcd']), low, high)
+        vertices += [{'x': float(xi), 'y': float(yi), 'term': name} for xi, yi in zip(x, y)]
+    level_end = high if spec.get('full_width_levels', False) else float(crisp_value)
+    levels = [{'x': low, 'x2': level_end, 'y': value, 'term': name}
+              for name, value in zip(names, membership_values) if value > 0]
+    color = {'field': 'term', 'type': 'nominal', 'sort': names,
+             'scale': {'domain': names, 'range': colors}, 'legend': {'title': None, 'orient': 'right'}}
+    x = {'field': 'x', 'type': 'quantitative', 'title': spec['label'],
+         'scale': {'domain': [low, high + spec['padding']], 'nice': False}}
+    y = {'field': 'y', 'type': 'quantitative', 'title': 'Membership Value', 'scale': {'domain': [0, 1.1]}}
+
+    return {
+        '$schema': 'https://vega.github.io/schema/vega-lite/v5.json',
+        'layer': [
+            {'data': {'values': vertices}, 'mark': {'type': 'line', 'strokeWidth': 1.5},
+             'encoding': {'x': x, 'y': y, 'color': color}},
+            {'data': {'values': levels}, 'mark': {'type': 'rule', 'strokeDash': [2, 2]},
+             'encoding': {'x': x, 'x2': {'field': 'x2'}, 'y': y, 'color': color}},
+            {'data': {'values': [{'x': float(crisp_value), 'y': 0., 'y2': max(membership_values)}]},
+             'mark': {'type': 'rule', 'strokeDash': [2, 2], 'color': 'black'},
+             'encoding': {'x': x, 'y': y, 'y2': {'field': 'y2'},
+                          'tooltip': [{'field': 'x', 'type': 'quantitative', 'title': 'input', 'format': '.2f'}]}}
+        ]
+    }
+
+
+class VariableVisualizer(object):
+    """Plot the membership functions of one variable with the current input marked.
+
+    `spec` is one of the variable dicts above; subclasses set it as SPEC.
+    """
+
+    SPEC = None
+
+    def __init__(self, membership_values, crisp_value, spec=None):
+        self.spec = spec if spec is not None else self.SPEC
         self.membership_values = membership_values
         self.crisp_value = crisp_value
-        self.universe = np.arange(0, 12.01, 0.01)
-        self.terms = {
-            'Very Slow': {
-                'mf': self.trapmf(self.universe, [0, 0, 2, 3]),
-                'color': 'red'
-            },
-            'Slow': {
-                'mf': self.trapmf(self.universe, [2, 3, 5, 6]),
-                'color': 'orange'
-            },
-            'Fast': {
-                'mf': self.trapmf(self.universe, [5, 6, 8, 9]),
-                'color': 'green'
-            },
-            'Very Fast': {
-                'mf': self.trapmf(self.universe, [8, 9, 12, 12]),
-                'color': 'blue'
-            }
-        }
+        self.low, self.high = self.spec['universe']
+        self.terms = self.spec['terms']
+        # matplotlib is imported on first plot, so the vertex helpers stay cheap
+        import matplotlib.pyplot as plt
         self.fig, self.ax = plt.subplots()
         self.plots = {}
 
     def plot(self):
         # Formatting: limits
         self.ax.set_ylim([0, 1.1])
-        self.ax.set_xlim([self.universe.min(),
-                          self.universe.max() + 1])
+        self.ax.set_xlim([self.low, self.high + self.spec['padding']])
 
         # Make the plots
         for key, term in self.terms.items():
-            self.plots[key] = self.ax.plot(self.universe,
-                                           term['mf'],
+            x, y = term_vertices(tuple(term['abcd']), self.low, self.high)
+            self.plots[key] = self.ax.plot(x, y,
                                            label=key,
                                            linewidth=1.5,
                                            color=term['color'])
 
-        crisp_value_line = np.arange(0, self.membership_values.max(), 0.01)
-        membership_value_line = np.arange(self.universe.min(), self.universe.max(), 0.01)
+        self.plots['res'] = self.ax.plot([self.crisp_value, self.crisp_value],
+                                         [0, self.membership_values.max()],
+                                         ':',
+                                         color='black')
 
-        self.plots['res'] = self.ax.plot(np.full(crisp_value_line.shape[0], self.crisp_value),
-                                        crisp_value_line,
-                                        ':',
-                                        color='black')
-        
-        for i in range(self.membership_values.shape[0]):
+        level_end = self.high if self.spec.get('full_width_levels', False) else self.crisp_value
+        for i, term in enumerate(self.terms.values()):
             if self.membership_values[i] > 0:
-                self.plots[i] = self.ax.plot(membership_value_line,
-                                             np.full(membership_value_line.shape[0], self.membership_values[i]),
+                self.plots[i] = self.ax.plot([self.low, level_end],
+                                             [self.membership_values[i], self.membership_values[i]],
                                              ':',
-                                             color=list(self.terms.items())[i][1]['color'])
+                                             color=term['color'])
 
-        plt.yticks([round(j, 2) for j in self.membership_values if j > 0] + [round(j, 2) for j in np.arange(0, 1.2, 0.2).tolist()], [str(round(j, 2)) + "     " for j in self.membership_values if j > 0] + [round(j, 2) for j in np.arange(0, 1.2, 0.2).tolist()])
+        active = [round(j, 2) for j in self.membership_values if j > 0]
+        steps = [round(j, 2) for j in np.arange(0, 1.2, 0.2).tolist()]
+        self.ax.set_yticks(active + steps, [str(j) + "     " for j in active] + steps)
 
         # Place legend in upper left
         self.ax.legend(framealpha=0.5, loc='right')
@@ -421,48 +180,26 @@ class WateringSpeedVisualizer(object):
 
         # Label the axes
         self.ax.set_ylabel('Membership Value')
-        self.ax.set_xlabel('Watering Speed (liters/minute)')
+        self.ax.set_xlabel(self.spec['label'])
 
         xtick = "\n" + str(round(self.crisp_value, 2))
-        plt.xticks([round(self.crisp_value, 2)] + [i for i in range(0, 14, 2)], [xtick] + [i for i in range(0, 14, 2)])
+        self.ax.set_xticks([round(self.crisp_value, 2)] + list(self.spec['xticks']),
+                           [xtick] + list(self.spec['xticks']))
 
         return self.fig, self.ax
-    
-    def trimf(self, x, abc):
-        a, b, c = np.r_[abc]     # Zero-indexing in Python
-
-        y = np.zeros(len(x))
-
-        # Left side
-        if a != b:
-            idx = np.nonzero(np.logical_and(a < x, x < b))[0]
-            y[idx] = (x[idx] - a) / float(b - a)
-
-        # Right side
-        if b != c:
-            idx = np.nonzero(np.logical_and(b < x, x < c))[0]
-            y[idx] = (c - x[idx]) / float(c - b)
 
-        idx = np.nonzero(x == b)
-        y[idx] = 1
-        return y
 
-    def trapmf(self, x, abcd):
-        a, b, c, d = np.r_[abcd]
-        y = np.ones(len(x))
+class TemperatureVisualizer(VariableVisualizer):
+    SPEC = TEMPERATURE
 
-        idx = np.nonzero(x <= b)[0]
-        y[idx] = self.trimf(x[idx], np.r_[a, b, b])
 
-        idx = np.nonzero(x >= c)[0]
-        y[idx] = self.trimf(x[idx], np.r_[c, c, d])
+class SoilMoistureVisualizer(VariableVisualizer):
+    SPEC = SOIL_MOISTURE
 
-        idx = np.nonzero(x < a)[0]
-        y[idx] = np.zeros(len(idx))
 
-        idx = np.nonzero(x > d)[0]
-        y[idx] = np.zeros(len(idx))
+class LightIntensityVisualizer(VariableVisualizer):
+    SPEC = LIGHT_INTENSITY
 
-        return y
 
-    
+class WateringSpeedVisualizer(VariableVisualizer):
+    SPEC = WATERING_SPEED
@@ -0,0 +1,148 @@
+from bisect import bisect_right
+import time
+
+import numpy as np
+
+from algorithm.fuzzy_logic import FuzzyLogic
+
+BREAKPOINTS = (FuzzyLogic.TEMPERATURE_BREAKPOINTS, FuzzyLogic.SOIL_MOISTURE_BREAKPOINTS,
+               FuzzyLogic.LIGHT_INTENSITY_BREAKPOINTS)
+RULE_KEYS = {tuple(int(i) for i in key): key for key in FuzzyLogic.RULES_SET}
+
+
+def segment_of(value, breakpoints):
+    """Index of the linear piece of the fuzzification holding value.
+
+    The same search as FuzzyLogic._fuzzify: values below the first
+    breakpoint are segment 0, each breakpoint starts the next one, and NaN
+    falls into the last.
+    """
+    return bisect_right(breakpoints, value)
+
+
+def segment_terms(segment):
+    """Terms that can be non-zero in a segment: one on a plateau, two on a ramp."""
+    return sorted({segment // 2, (segment + 1) // 2})
+
+
+class ZoneController(object):
+    """Stateful FuzzyLogic for one zone, reusing work between sensor ticks.
+
+    update() returns the cached crisp_value when no input moved by more than
+    `tolerance` (a number or one per input, in the inputs' units) since the
+    last computation. When the readings stay in the same fuzzification
+    segments, only the changed inputs are refuzzified and only the rules
+    that can fire in those segments (at most 8) are re-aggregated. Otherwise
+    the whole reading is recomputed. Results are identical to a fresh
+    FuzzyLogic, except for readings skipped by a non-zero tolerance.
+    """
+
+    def __init__(self, tolerance=0., tracer=None, defuzzification_method='average_maximum'):
+        tolerance = np.broadcast_to(np.asarray(tolerance, dtype=float), (3,))
+        if (tolerance < 0).any():
+            raise ValueError("tolerance must not be negative")
+        self.tolerance = tuple(tolerance.tolist())
+        self.engine = FuzzyLogic(tracer=tracer, defuzzification_method=defuzzification_method)
+        self._fuzzifiers = (self.engine.do_fuzzification_of_temperature,
+                            self.engine.do_fuzzification_of_soil_moisture,
+                            self.engine.do_fuzzification_of_light_intensity)
+        self.inputs = None
+        self.segments = None
+        self.candidate_rules = []
+        self.rule_fired = False
+        self.hits = 0
+        self.segment_hits = 0
+        self.misses = 0
+
+    @property
+    def membership_values_of_temperature(self):
+        return self.engine.membership_values_of_temperature
+
+    @property
+    def membership_values_of_soil_moisture(self):
+        return self.engine.membership_values_of_soil_moisture
+
+    @property
+    def membership_values_of_light_intensity(self):
+        return self.engine.membership_values_of_light_intensity
+
+    @property
+    def membership_values_of_watering_speed(self):
+        return self.engine.membership_values_of_watering_speed
+
+    @property
+    def crisp_value(self):
+        return self.engine.crisp_value
+
+    @property
+    def output(self):
+        return self.engine.output
+
+    @property
+    def fired_rules(self):
+        """RULES_SET keys with a non-zero firing strength for the last computed reading."""
+        return [RULE_KEYS[a, b, c] for a, b, c, consequent in self.candidate_rules
+                if min(self.membership_values_of_temperature[a], self.membership_values_of_soil_moisture[b],
+                       self.membership_values_of_light_intensity[c]) > 0]
+
+    def counters(self):
+        return {'hits': self.hits, 'segment_hits': self.segment_hits, 'misses': self.misses}
+
+    def reset_counters(self):
+        self.hits = self.segment_hits = self.misses = 0
+
+    def update(self, temperature, soil_moisture, light_intensity):
+        """Crisp watering speed in liters/minute for a new reading of the zone."""
+        inputs = (temperature, soil_moisture, light_intensity)
+        if self.inputs is not None and all(abs(new - old) <= tolerance for new, old, tolerance
+                                           in zip(inputs, self.inputs, self.tolerance)):
+            self.hits += 1
+            return self.crisp_value
+
+        segments = (segment_of(temperature, BREAKPOINTS[0]), segment_of(soil_moisture, BREAKPOINTS[1]),
+                    segment_of(light_intensity, BREAKPOINTS[2]))
+        if segments == self.segments:
+            self.segment_hits += 1
+            changed = [new != old for new, old in zip(inputs, self.inputs)]
+            self._fuzzify(inputs, changed)
+            self._aggregate_candidates()
+        else:
+            self.misses += 1
+            self._fuzzify(inputs, (True, True, True))
+            self.rule_fired = self.engine.do_fuzzy_inference()
+            self.segments = segments
+            self.candidate_rules = [
+                (a, b, c, int(FuzzyLogic.RULE_CONSEQUENTS[a, b, c]))
+                for a in segment_terms(segments[0])
+                for b in segment_terms(segments[1])
+                for c in segment_terms(segments[2]) if FuzzyLogic.RULE_MASK[a, b, c]
+            ]
+        self.inputs = inputs
+        self.engine.do_defuzzification_of_watering_speed()
+        return self.crisp_value
+
+    def _fuzzify(self, inputs, changed):
+        for value, is_changed, do_fuzzification in zip(inputs, changed, self._fuzzifiers):
+            if is_changed:
+                do_fuzzification(value)
+
+    def _aggregate_candidates(self):
+        # Same min/max as FuzzyLogic.do_fuzzy_inference, restricted to the rules
+        # whose terms can be non-zero in the current segments
+        start = time.perf_counter()
+        temperature = self.membership_values_of_temperature.tolist()
+        soil_moisture = self.membership_values_of_soil_moisture.tolist()
+        light_intensity = self.membership_values_of_light_intensity.tolist()
+        watering_speed = [0.] * len(FuzzyLogic.WATERING_SPEED_TERMS)
+        rules_fired = 0
+        for a, b, c, consequent in self.candidate_rules:
+            strength = min(temperature[a], soil_moisture[b], light_intensity[c])
+            if strength > 0:
+                rules_fired += 1
+                if strength > watering_speed[consequent]:
+                    watering_speed[consequent] = strength
+        self.engine.membership_values_of_watering_speed[:] = watering_speed
+        self.rule_fired = rules_fired > 0
+        self.engine.tracer.record('fuzzy_inference', time.perf_counter() - start,
+                                  membership_values=self.engine.membership_values_of_watering_speed,
+                                  rule_fired=self.rule_fired, rules_fired=rules_fired)
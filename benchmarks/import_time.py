@@ -0,0 +1,79 @@
+"""Measure how long the engine modules take to import in a fresh interpreter.
+
+    python -m benchmarks.import_time --output imports.json
+
+Each module is imported `--repeat` times in a new process and the median
+wall time reported, with the slowest modules it pulled in (from
+`python -X importtime`). The run fails if a core module loads one of the
+optional heavy dependencies, which only the visual and comparison paths
+should pay for.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+CORE_MODULES = ('algorithm.fuzzy_logic', 'algorithm.defuzzification', 'algorithm.tracing',
+                'algorithm.lookup_table', 'algorithm.replay', 'algorithm.visualizer',
+                'algorithm.skfuzzy_controller', 'algorithm.controller_config', 'algorithm.sparse_rules',
+                'service.app')
+OPTIONAL_MODULES = ('matplotlib', 'pandas', 'skfuzzy', 'streamlit', 'pyarrow', 'numba')
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [name for name in {optional!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module, repeat=5):
+    """Median import seconds, heavy modules loaded and the slowest direct imports (name, seconds)."""
+    runs = []
+    for i in range(repeat):
+        output = subprocess.run([sys.executable, '-c', SCRIPT.format(module=module, optional=OPTIONAL_MODULES)],
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output))
+    runs.sort(key=lambda run: run['seconds'])
+
+    # -X importtime writes "import time: self [us] | cumulative [us] | name" to
+    # stderr, with the name indented two spaces per nesting level
+    profile = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                             capture_output=True, text=True, check=True).stderr
+    slowest = []
+    for line in profile.splitlines()[1:]:
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].startswith('   ') and not fields[2].startswith('     '):
+            slowest.append((fields[2].strip(), int(fields[1]) / 1e6))
+    slowest.sort(key=lambda entry: -entry[1])
+    return runs[len(runs) // 2]['seconds'], runs[0]['loaded'], slowest[:5]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import time of the engine modules")
+    parser.add_argument('modules', nargs='*', default=list(CORE_MODULES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.modules:
+        seconds, loaded, slowest = measure(module, args.repeat)
+        results.append({'module': module, 'seconds': seconds, 'optional_loaded': loaded,
+                        'slowest': [{'module': name, 'seconds': time} for name, time in slowest]})
+        print("{:>30} {:8.1f} ms  {}".format(module, seconds * 1e3,
+                                             ', '.join('{} {:.1f} ms'.format(name, time * 1e3)
+                                                       for name, time in slowest[:3])))
+        if loaded:
+            print("{:>30} loads {}".format('', ', '.join(loaded)))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'python': sys.version.split()[0], 'results': results}, file, indent=2)
+    if any(result['optional_loaded'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Micro-benchmark: string-keyed RULES_SET lookups vs. the compiled rule table.
+
+Both readings are reported: the common one on a single ramp, where 2 rules
+fire and the fixed cost per call dominates, and one on three ramps where 8
+rules fire.
+
+Run from the repository root:
+
+    python -m benchmarks.rule_inference
+"""
+import timeit
+
+from algorithm.fuzzy_logic import FuzzyLogic
+
+
+def string_keyed_inference(fz):
+    # The pre-compilation do_fuzzy_inference, kept here as the baseline
+    rule_fired = False
+    for i in range(fz.membership_values_of_temperature.shape[0]):
+        combination = ''
+        if fz.membership_values_of_temperature[i] > 0:
+            combination += str(i)
+            for j in range(fz.membership_values_of_soil_moisture.shape[0]):
+                if fz.membership_values_of_soil_moisture[j] > 0:
+                    combination += str(j)
+                    for k in range(fz.membership_values_of_light_intensity.shape[0]):
+                        if fz.membership_values_of_light_intensity[k] > 0:
+                            combination += str(k)
+                            if combination in fz.RULES_SET:
+                                rule_fired = True
+                                [a, b, c] = [int(i) for i in list(combination)]
+                                new_value = min(fz.membership_values_of_temperature[a],
+                                                fz.membership_values_of_soil_moisture[b],
+                                                fz.membership_values_of_light_intensity[c])
+                                old_value = fz.membership_values_of_watering_speed[fz.RULES_SET[combination]]
+                                fz.membership_values_of_watering_speed[fz.RULES_SET[combination]] = new_value if (new_value > old_value) else old_value
+                            combination = combination[0:2]
+                    combination = combination[0:1]
+    return rule_fired
+
+
+def compiled_inference(fz):
+    return fz.do_fuzzy_inference()
+
+
+def fuzzified(temperature, soil_moisture, light_intensity):
+    fz = FuzzyLogic()
+    fz.do_fuzzification_of_temperature(temperature)
+    fz.do_fuzzification_of_soil_moisture(soil_moisture)
+    fz.do_fuzzification_of_light_intensity(light_intensity)
+    return fz
+
+
+def main(number=20000):
+    # One reading on a single ramp (2 rules fire) and one on three ramps (8 rules)
+    for reading in [(20.0, 50.0, 500.0), (27.0, 48.0, 723.0)]:
+        fz = fuzzified(*reading)
+        for name, inference in [('string keys', string_keyed_inference), ('rule table', compiled_inference)]:
+            def call():
+                fz.membership_values_of_watering_speed[:] = 0
+                inference(fz)
+            per_call = min(timeit.repeat(call, number=number, repeat=5)) / number
+            print(f"{reading} {name:>12}: {per_call * 1e6:8.2f} us/call  {fz.membership_values_of_watering_speed}")
+
+
+if __name__ == '__main__':
+    main()
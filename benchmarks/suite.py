@@ -0,0 +1,253 @@
+"""Benchmark and cross-check the watering-speed engines.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline results.json   # fail on regressions
+
+Engines: the scalar FuzzyLogic methods (on a fresh instance, and through
+one reused instance's evaluate()), FuzzyLogic.evaluate_batch, the
+active-rule SparseRuleEvaluator, the process-pool ParallelEvaluator, the skfuzzy ControlSystem of the lib page and
+the precomputed LookupTable. Every engine runs on a seeded random workload
+and on a regular grid, as single calls (latency percentiles), as one batch
+(throughput and peak traced memory) and from a cold interpreter (import +
+first evaluation). skfuzzy samples its universe every 0.01 L/min, so its
+results differ from the closed-form defuzzification by up to about half that.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from algorithm.fuzzy_logic import FuzzyLogic
+from algorithm.lookup_table import DOMAIN, LookupTable
+from algorithm.parallel import ParallelEvaluator
+from algorithm.sparse_rules import SparseRuleEvaluator
+
+COLD_START = {
+    'fuzzy_logic': "from algorithm.fuzzy_logic import FuzzyLogic\n"
+                   "FuzzyLogic.evaluate_batch([20.], [50.], [500.])",
+    'skfuzzy': "from algorithm.skfuzzy_controller import get_controller\n"
+               "get_controller('centroid').compute(20., 50., 500.)",
+    'lookup_table': "from algorithm.lookup_table import LookupTable\n"
+                    "LookupTable.build().lookup([20.], [50.], [500.])"
+}
+
+
+def random_workload(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return tuple(rng.uniform(low, high, rows) for low, high in DOMAIN)
+
+
+def grid_workload(rows):
+    # Roughly rows points on a regular grid spanning the whole input domain
+    side = max(2, int(round(rows ** (1 / 3))))
+    axes = [np.linspace(low, high, side) for low, high in DOMAIN]
+    return tuple(axis.ravel() for axis in np.meshgrid(*axes, indexing='ij'))
+
+
+def scalar_fuzzy_logic(temperature, soil_moisture, light_intensity):
+    fz = FuzzyLogic()
+    fz.do_fuzzification_of_temperature(temperature)
+    fz.do_fuzzification_of_soil_moisture(soil_moisture)
+    fz.do_fuzzification_of_light_intensity(light_intensity)
+    fz.do_fuzzy_inference()
+    fz.do_defuzzification_of_watering_speed()
+    return fz.crisp_value
+
+
+def skfuzzy_engine(method):
+    from algorithm.skfuzzy_controller import get_controller
+    controller = get_controller(method)
+
+    def compute(temperature, soil_moisture, light_intensity):
+        try:
+            return controller.compute(temperature, soil_moisture, light_intensity)
+        except ValueError:
+            # skfuzzy refuses to defuzzify when no rule fires
+            return np.nan
+    return compute
+
+
+def single_calls(function, readings, rows):
+    """Latency of one-reading calls; returns (crisp values, per-call seconds)."""
+    values, latencies = np.empty(rows), np.empty(rows)
+    for i in range(rows):
+        start = time.perf_counter()
+        values[i] = function(readings[0][i], readings[1][i], readings[2][i])
+        latencies[i] = time.perf_counter() - start
+    return values, latencies
+
+
+def single_result(engine, workload, latencies):
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {'engine': engine, 'scenario': 'single', 'workload': workload, 'rows': int(latencies.shape[0]),
+            'seconds': float(latencies.sum()), 'rows_per_s': float(latencies.shape[0] / latencies.sum()),
+            'p50_us': float(p50 * 1e6), 'p99_us': float(p99 * 1e6)}
+
+
+def batch_result(engine, workload, function, readings):
+    """Throughput and peak traced allocation of one batch call; returns (values, result)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    values = function(*readings)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rows = readings[0].shape[0]
+    return values, {'engine': engine, 'scenario': 'batch', 'workload': workload, 'rows': int(rows),
+                    'seconds': seconds, 'rows_per_s': rows / seconds, 'peak_memory_bytes': int(peak)}
+
+
+def cold_start(engine, code):
+    script = "import time\nstart = time.perf_counter()\n{}\nprint(time.perf_counter() - start)".format(code)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    return {'engine': engine, 'scenario': 'cold_start', 'workload': 'single', 'rows': 1,
+            'seconds': float(output.split()[-1])}
+
+
+def accuracy(reference, candidate, workload, expected, actual):
+    """Errors where both sides are numbers; a NaN on one side only is a mismatch of its own."""
+    expected_nan, actual_nan = np.isnan(expected), np.isnan(actual)
+    compared = ~(expected_nan | actual_nan)
+    error = np.abs(expected[compared] - actual[compared])
+    return {'reference': reference, 'candidate': candidate, 'workload': workload,
+            'compared_rows': int(compared.sum()),
+            'nan_mismatches': int(np.count_nonzero(expected_nan != actual_nan)),
+            'max_abs_error': float(error.max()) if error.size else None,
+            'mean_abs_error': float(error.mean()) if error.size else None}
+
+
+def run(single_rows, batch_rows, skfuzzy_rows, seed, workers=None):
+    results, checks = [], []
+    table = LookupTable.build()
+    sparse = SparseRuleEvaluator()
+    workloads = {'random': random_workload(batch_rows, seed), 'grid': grid_workload(batch_rows)}
+    for workload, readings in workloads.items():
+        rows = readings[0].shape[0]
+
+        batch, result = batch_result('fuzzy_logic_batch', workload, FuzzyLogic.evaluate_batch, readings)
+        results.append(result)
+        # skfuzzy is slow and fails outright where no rule fires, so it only
+        # sees an evenly spaced sample of the readings that fire a rule
+        fired = np.nonzero(batch['rule_fired'])[0]
+        sample = fired[np.linspace(0, fired.shape[0] - 1, min(skfuzzy_rows, fired.shape[0])).astype(np.intp)]
+        subset = tuple(column[sample] for column in readings)
+        batch = batch['crisp_value']
+        for method in ('centroid', 'mom'):
+            analytic, result = batch_result('fuzzy_logic_batch_' + method, workload,
+                                            lambda *r: FuzzyLogic.evaluate_batch(*r, defuzzification_method=method)['crisp_value'],
+                                            readings)
+            results.append(result)
+            values, latencies = single_calls(skfuzzy_engine(method), subset, sample.shape[0])
+            results.append(single_result('skfuzzy_' + method, workload, latencies))
+            checks.append(accuracy('skfuzzy_' + method, 'fuzzy_logic_batch_' + method, workload,
+                                   values, analytic[sample]))
+
+        values, result = batch_result('sparse_rules_batch', workload, sparse.evaluate_batch, readings)
+        results.append(result)
+        checks.append(accuracy('fuzzy_logic_batch', 'sparse_rules_batch', workload, batch, values['crisp_value']))
+
+        with ParallelEvaluator(workers) as evaluator:
+            # Start the pool outside the timed call
+            evaluator.evaluate(*(column[:1] for column in readings))
+            parallel, result = batch_result('parallel', workload, evaluator.evaluate, readings)
+        results.append(result)
+        checks.append(accuracy('fuzzy_logic_batch', 'parallel', workload, batch, parallel['crisp_value']))
+
+        lookup, result = batch_result('lookup_table', workload, table.lookup, readings)
+        results.append(result)
+        checks.append(accuracy('fuzzy_logic_batch', 'lookup_table', workload, batch, lookup))
+
+        single = min(single_rows, rows)
+        values, latencies = single_calls(scalar_fuzzy_logic, readings, single)
+        results.append(single_result('fuzzy_logic', workload, latencies))
+        checks.append(accuracy('fuzzy_logic', 'fuzzy_logic_batch', workload, values, batch[:single]))
+        values, latencies = single_calls(FuzzyLogic().evaluate, readings, single)
+        results.append(single_result('fuzzy_logic_evaluate', workload, latencies))
+        checks.append(accuracy('fuzzy_logic_evaluate', 'fuzzy_logic_batch', workload, values, batch[:single]))
+        values, latencies = single_calls(sparse.evaluate, readings, single)
+        results.append(single_result('sparse_rules', workload, latencies))
+        checks.append(accuracy('sparse_rules', 'fuzzy_logic_batch', workload, values, batch[:single]))
+        values, latencies = single_calls(lambda *r: table.lookup(*r)[0], readings, single)
+        results.append(single_result('lookup_table', workload, latencies))
+
+    for engine, code in COLD_START.items():
+        results.append(cold_start(engine, code))
+    return results, checks
+
+
+def regressions(results, baseline, tolerance):
+    """Entries whose throughput dropped by more than `tolerance` against the baseline."""
+    def key(entry):
+        return entry['engine'], entry['scenario'], entry['workload']
+    previous = {key(entry): entry for entry in baseline['results']}
+    slower = []
+    for entry in results:
+        old = previous.get(key(entry))
+        if old is None:
+            continue
+        if 'rows_per_s' in entry and entry['rows_per_s'] < old['rows_per_s'] * (1 - tolerance):
+            slower.append((key(entry), old['rows_per_s'], entry['rows_per_s']))
+        elif 'rows_per_s' not in entry and entry['seconds'] > old['seconds'] * (1 + tolerance):
+            slower.append((key(entry), old['seconds'], entry['seconds']))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the watering-speed engines")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed relative slowdown against the baseline")
+    parser.add_argument('--single-rows', type=int, default=2000)
+    parser.add_argument('--batch-rows', type=int, default=1000000)
+    parser.add_argument('--skfuzzy-rows', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, help="processes for the parallel engine, default all cores")
+    args = parser.parse_args(argv)
+
+    results, checks = run(args.single_rows, args.batch_rows, args.skfuzzy_rows, args.seed, args.workers)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results,
+        'accuracy': checks
+    }
+
+    for entry in results:
+        line = "{engine:>26} {scenario:>10} {workload:>6}".format(**entry)
+        if 'rows_per_s' in entry:
+            line += " {:>14,.0f} rows/s".format(entry['rows_per_s'])
+        else:
+            line += " {:>14.3f} s".format(entry['seconds'])
+        if 'p50_us' in entry:
+            line += "  p50 {:.1f} us  p99 {:.1f} us".format(entry['p50_us'], entry['p99_us'])
+        if 'peak_memory_bytes' in entry:
+            line += "  peak {:.1f} MiB".format(entry['peak_memory_bytes'] / 2 ** 20)
+        print(line)
+    for check in checks:
+        print("{candidate:>26} vs {reference:<22} {workload:>6}  max |error| {max_abs_error}, "
+              "NaN on one side {nan_mismatches}".format(**check))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            slower = regressions(results, json.load(file), args.tolerance)
+        for key, old, new in slower:
+            print("REGRESSION {}: {:.4g} -> {:.4g}".format(' / '.join(key), old, new))
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Throughput of one shared CompiledController across a thread pool.
+
+Run from the repository root:
+
+    python -m benchmarks.threads --rows 1000000 --threads 1 2 4 8
+
+Every thread count evaluates the same readings, split into `--chunk-rows`
+batches handed to a ThreadPoolExecutor, with the NumPy path and, when Numba
+is installed, the fused nogil kernel. Scaling with threads is bounded by the
+cores of the machine and by how long each path holds the GIL.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from algorithm import kernel
+from algorithm.controller_config import compile_config
+from algorithm.lookup_table import DOMAIN
+
+
+def throughput(controller, readings, threads, chunk_rows, use_numba, repeat=3):
+    """Best rows per second over `repeat` runs."""
+    rows = readings.shape[1]
+    chunks = [readings[:, start:start + chunk_rows] for start in range(0, rows, chunk_rows)]
+    best = 0.
+    with ThreadPoolExecutor(threads) as pool:
+        for i in range(repeat):
+            start = time.perf_counter()
+            list(pool.map(lambda chunk: controller.evaluate_batch(*chunk, use_numba=use_numba), chunks))
+            best = max(best, rows / (time.perf_counter() - start))
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure threaded CompiledController throughput")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--chunk-rows', type=int, default=16384)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    readings = np.stack([rng.uniform(low, high, args.rows) for low, high in DOMAIN])
+    controller = compile_config()
+    paths = [('numpy', False)]
+    if kernel.numba_kernel() is not None:
+        # Compile outside the timed runs
+        controller.evaluate_batch(*readings[:, :1], use_numba=True)
+        paths.append(('numba', True))
+
+    print("{} cores, {} rows in chunks of {}".format(os.cpu_count(), args.rows, args.chunk_rows))
+    for name, use_numba in paths:
+        single = None
+        for threads in sorted(set(args.threads)):
+            rate = throughput(controller, readings, threads, args.chunk_rows, use_numba)
+            single = single or rate
+            print("{:>5} {:>3} threads: {:>12,.0f} rows/s  x{:.2f}".format(name, threads, rate, rate / single))
+
+
+if __name__ == '__main__':
+    main()
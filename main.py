@@ -1,12 +1,31 @@
 import streamlit as st
 import numpy as np
+from algorithm.controller_config import DEFAULT_CONFIG
 from algorithm.fuzzy_logic import FuzzyLogic
-from algorithm.visualizer import TemperatureVisualizer
-from algorithm.visualizer import SoilMoistureVisualizer
-from algorithm.visualizer import LightIntensityVisualizer
-from algorithm.visualizer import WateringSpeedVisualizer
-import matplotlib.pyplot as plt
-import pandas as pd
+from algorithm.render_cache import RENDER_CACHE
+from algorithm.tracing import PrintTracer, RingBufferTracer, TeeTracer, stage_timer
+from algorithm.visualizer import vega_lite_spec
+
+
+def show_chart(visualizer_class, membership_values, crisp_value):
+    with stage_timer(run_tracer, 'plot_' + visualizer_class.__name__):
+        if charts == "Interactive":
+            st.vega_lite_chart(vega_lite_spec(visualizer_class.SPEC, membership_values, crisp_value), use_container_width=True)
+        else:
+            st.image(RENDER_CACHE.variable(visualizer_class, membership_values, crisp_value), use_column_width=True)
+
+
+def show_performance(tracer):
+    import pandas as pd
+    with st.expander("Performance"):
+        timings = [(stage, total * 1000, count) for stage, (total, count) in tracer.timings().items()]
+        st.table(pd.DataFrame(timings, columns=("Stage", "Time (ms)", "Calls")))
+        rules_fired = sum(entry.get('rules_fired', 0) for entry in tracer.records)
+        st.markdown(f"Rules fired: {rules_fired} · plot cache: {RENDER_CACHE.hits} hits, {RENDER_CACHE.misses} misses")
+
+
+# Input ranges are the universes of the controller config
+TEMPERATURE_RANGE, SOIL_MOISTURE_RANGE, LIGHT_INTENSITY_RANGE = (variable['universe'] for variable in DEFAULT_CONFIG['inputs'])
 
 # Initialize st.session_state.page1 if it doesn't exist
 if 'page1' not in st.session_state:
@@ -82,10 +101,16 @@ with st.sidebar:
     def submit_light_intensity():
         st.session_state.page1['light_intensity'] = st.session_state.light_intensity_input_value
 
+    def submit_charts():
+        st.session_state.page1['charts'] = st.session_state.charts_value
+
     st.title("Input Parameters")
-    temperature_input = st.number_input("**Temperature (°C):**", min_value=-20.0, max_value=50.0, step=0.1, value=st.session_state.page1['temperature'], key='temperature_input_value', on_change=submit_temperature)
-    soil_moisture_input = st.number_input("**Soil Moisture (%)**", min_value=0.0, max_value=100.0, step=0.1, value=st.session_state.page1['soil_moisture'], key='soil_moisture_input_value', on_change=submit_soil_moisture)
-    light_intensity_input = st.number_input("**Light Intensity PAR (µmol/m²/s)**", min_value=0.0, max_value=1000.0, step=0.1, value=st.session_state.page1['light_intensity'], key='light_intensity_input_value', on_change=submit_light_intensity)
+    temperature_input = st.number_input("**Temperature (°C):**", min_value=float(TEMPERATURE_RANGE[0]), max_value=float(TEMPERATURE_RANGE[1]), step=0.1, value=st.session_state.page1['temperature'], key='temperature_input_value', on_change=submit_temperature)
+    soil_moisture_input = st.number_input("**Soil Moisture (%)**", min_value=float(SOIL_MOISTURE_RANGE[0]), max_value=float(SOIL_MOISTURE_RANGE[1]), step=0.1, value=st.session_state.page1['soil_moisture'], key='soil_moisture_input_value', on_change=submit_soil_moisture)
+    light_intensity_input = st.number_input("**Light Intensity PAR (µmol/m²/s)**", min_value=float(LIGHT_INTENSITY_RANGE[0]), max_value=float(LIGHT_INTENSITY_RANGE[1]), step=0.1, value=st.session_state.page1['light_intensity'], key='light_intensity_input_value', on_change=submit_light_intensity)
+    # Images are rendered on the server; interactive charts only send vertices and degrees to the browser
+    chart_modes = ("Images", "Interactive")
+    charts = st.radio("**Charts:**", chart_modes, index=chart_modes.index(st.session_state.page1.get('charts', "Images")), key='charts_value', on_change=submit_charts, horizontal=True)
 
     col1, col2, col3 = st.columns([1, 0.5, 0.477])
     with col1:
@@ -108,32 +133,38 @@ if submitted == False and st.session_state.page1['is_first_load'] == True:
     """, unsafe_allow_html=True)
 
 if submitted == True or st.session_state.page1['is_first_load'] == False:
+    # Tables and plots are only needed once there are results to show
+    import pandas as pd
+    from algorithm.visualizer import TemperatureVisualizer
+    from algorithm.visualizer import SoilMoistureVisualizer
+    from algorithm.visualizer import LightIntensityVisualizer
+    from algorithm.visualizer import WateringSpeedVisualizer
+
     st.header("1. Fuzzification")
-    fz = FuzzyLogic()
+    # Stage timings of this run, shown in the performance expander
+    run_tracer = RingBufferTracer()
+    fz = FuzzyLogic(tracer=TeeTracer(PrintTracer(), run_tracer))
 
     st.subheader("a. Temperature")
     st.markdown(f"<p class='text'>From the input value {temperature_input}°C, through the predefined membership functions, the fuzzy values ​​are calculated as follows:</p>", unsafe_allow_html=True)
     fz.do_fuzzification_of_temperature(temperature_input)
-    st.table(pd.DataFrame(np.array([[i for i in fz.membership_values_of_temperature]]), columns = ("Very cold", "Cold", "Warm", "Hot")))
+    st.table(pd.DataFrame(np.array([[i for i in fz.membership_values_of_temperature]]), columns = list(TemperatureVisualizer.SPEC['terms'])))
     st.markdown("<p class='text'>Visualization graph:</p>", unsafe_allow_html=True)
-    fig1, ax1 = TemperatureVisualizer(fz.membership_values_of_temperature, temperature_input).plot()
-    st.write(fig1)
+    show_chart(TemperatureVisualizer, fz.membership_values_of_temperature, temperature_input)
 
     st.subheader("b. Soil Moisture")
     st.markdown(f"<p class='text'>From the input value {soil_moisture_input}%, through the predefined membership functions, the fuzzy values ​​are calculated as follows:</p>", unsafe_allow_html=True)
     fz.do_fuzzification_of_soil_moisture(soil_moisture_input)
-    st.table(pd.DataFrame(np.array([[i for i in fz.membership_values_of_soil_moisture]]), columns = ("Very dry", "Dry", "Moist", "Very moist")))
+    st.table(pd.DataFrame(np.array([[i for i in fz.membership_values_of_soil_moisture]]), columns = list(SoilMoistureVisualizer.SPEC['terms'])))
     st.markdown("<p class='text'>Visualization graph:</p>", unsafe_allow_html=True)
-    fig2, ax2 = SoilMoistureVisualizer(fz.membership_values_of_soil_moisture, soil_moisture_input).plot()
-    st.write(fig2)
+    show_chart(SoilMoistureVisualizer, fz.membership_values_of_soil_moisture, soil_moisture_input)
 
     st.subheader("c. Light Intensity PAR")
     st.markdown(f"<p class='text'>From the input value {light_intensity_input} µmol/m²/s, through the predefined membership functions, the fuzzy values ​​are calculated as follows:</p>", unsafe_allow_html=True)
     fz.do_fuzzification_of_light_intensity(light_intensity_input)
-    st.table(pd.DataFrame(np.array([[i for i in fz.membership_values_of_light_intensity]]), columns = ("Weak", "Medium", "Strong")))
+    st.table(pd.DataFrame(np.array([[i for i in fz.membership_values_of_light_intensity]]), columns = list(LightIntensityVisualizer.SPEC['terms'])))
     st.markdown("<p class='text'>Visualization graph:</p>", unsafe_allow_html=True)
-    fig3, ax3 = LightIntensityVisualizer(fz.membership_values_of_light_intensity, light_intensity_input).plot()
-    st.write(fig3)
+    show_chart(LightIntensityVisualizer, fz.membership_values_of_light_intensity, light_intensity_input)
 
     st.header("2. Fuzzy Inference")
     ok = fz.do_fuzzy_inference()
@@ -143,16 +174,14 @@ if submitted == True or st.session_state.page1['is_first_load'] == False:
 
     else:
         st.markdown(f"<p class='text'>From the fuzzy values calculated above, applying the defined rules, we calculate the fuzzy values for the output watering speed as follows:</p>", unsafe_allow_html=True)
-        st.table(pd.DataFrame(np.array([[i for i in fz.membership_values_of_watering_speed]]), columns = ("Very Slow", "Slow", "Fast", "Very Fast")))
+        st.table(pd.DataFrame(np.array([[i for i in fz.membership_values_of_watering_speed]]), columns = list(WateringSpeedVisualizer.SPEC['terms'])))
 
         st.header("3. Defuzzification")
         st.markdown(f"<p class='text'>Projecting the computed values from fuzzy inference into the membership function of watering speed, we have:</p>", unsafe_allow_html=True)
         fz.do_defuzzification_of_watering_speed()
-        fig4, ax4 = WateringSpeedVisualizer(fz.membership_values_of_watering_speed, fz.crisp_value).plot()
-        st.write(fig4)
+        show_chart(WateringSpeedVisualizer, fz.membership_values_of_watering_speed, fz.crisp_value)
         st.markdown(f"<p class='text'>Identifying the two maximum points, the beginning and the end are: {fz.max1} and {fz.max2}</p>", unsafe_allow_html=True)
         st.markdown("<p class='text'>Using the centroid method, we determine the output value as:</p>", unsafe_allow_html=True)
         st.markdown(f"<p class='text center'>({fz.max1} + {fz.max2}) / 2 =  {fz.crisp_value} liters/minute ~ <b>{'{:.10f}'.format(fz.output)} m3/s</b></p>", unsafe_allow_html=True)
 
-   
-        
\ No newline at end of file
+    show_performance(run_tracer)
@@ -1,9 +1,12 @@
 import streamlit as st
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
-import numpy as np
-import matplotlib.pyplot as plt
-from skfuzzy.control.visualization import FuzzyVariableVisualizer
+from algorithm.controller_config import DEFAULT_CONFIG
+from algorithm.render_cache import RENDER_CACHE
+from algorithm.skfuzzy_controller import get_controller
+from algorithm.tracing import RingBufferTracer, stage_timer
+from algorithm.visualizer import WATERING_SPEED, vega_lite_spec
+
+# Input ranges are the universes of the controller config
+TEMPERATURE_RANGE, SOIL_MOISTURE_RANGE, LIGHT_INTENSITY_RANGE = (variable['universe'] for variable in DEFAULT_CONFIG['inputs'])
 
 # Initialize st.session_state.page1 if it doesn't exist
 if 'page1' not in st.session_state:
@@ -79,11 +82,17 @@ with st.sidebar:
     def submit_light_intensity():
         st.session_state.page1['light_intensity'] = st.session_state.light_intensity_input_value
 
+    def submit_charts():
+        st.session_state.page1['charts'] = st.session_state.charts_value
+
     # Input fields for temperature, soil moisture, and light intensity
     st.title("Input Parameters")
-    temperature_input = st.number_input("**Temperature (°C):**", min_value=-20.0, max_value=50.0, step=0.1, value=st.session_state.page1['temperature'], key='temperature_input_value', on_change=submit_temperature)
-    soil_moisture_input = st.number_input("**Soil Moisture (%):**", min_value=0.0, max_value=100.0, step=0.1, value=st.session_state.page1['soil_moisture'], key='soil_moisture_input_value', on_change=submit_soil_moisture)
-    light_intensity_input = st.number_input("**Light Intensity PAR (µmol/m²/s):**", min_value=0.0, max_value=1000.0, step=0.1, value=st.session_state.page1['light_intensity'], key='light_intensity_input_value', on_change=submit_light_intensity)
+    temperature_input = st.number_input("**Temperature (°C):**", min_value=float(TEMPERATURE_RANGE[0]), max_value=float(TEMPERATURE_RANGE[1]), step=0.1, value=st.session_state.page1['temperature'], key='temperature_input_value', on_change=submit_temperature)
+    soil_moisture_input = st.number_input("**Soil Moisture (%):**", min_value=float(SOIL_MOISTURE_RANGE[0]), max_value=float(SOIL_MOISTURE_RANGE[1]), step=0.1, value=st.session_state.page1['soil_moisture'], key='soil_moisture_input_value', on_change=submit_soil_moisture)
+    light_intensity_input = st.number_input("**Light Intensity PAR (µmol/m²/s):**", min_value=float(LIGHT_INTENSITY_RANGE[0]), max_value=float(LIGHT_INTENSITY_RANGE[1]), step=0.1, value=st.session_state.page1['light_intensity'], key='light_intensity_input_value', on_change=submit_light_intensity)
+    # Images are rendered on the server; interactive charts only send vertices and degrees to the browser
+    chart_modes = ("Images", "Interactive")
+    charts = st.radio("**Charts:**", chart_modes, index=chart_modes.index(st.session_state.page1.get('charts', "Images")), key='charts_value', on_change=submit_charts, horizontal=True)
 
     # Buttons for submitting and resetting input values
     col1, col2, col3 = st.columns([1, 0.5, 0.477])
@@ -95,74 +104,6 @@ with st.sidebar:
         if st.button("Reset"):
             st.session_state.page1['is_first_load'] = True
 
-# Custom method to get the figure for fuzzy variable visualization
-def get_fig(self, sim):
-    fig, ax = FuzzyVariableVisualizer(self).view(sim)
-    return fig
-
-ctrl.Consequent.get_fig = get_fig
-
-# Define fuzzy input and output variables
-temperature = ctrl.Antecedent(np.arange(-20, 50.01, 0.01), 'Temperature')
-soil_moisture = ctrl.Antecedent(np.arange(0, 100.01, 0.01), 'Soil Moisture')
-light_intensity = ctrl.Antecedent(np.arange(0, 1000.01, 0.01), 'Light Intensity')
-watering_speed = ctrl.Consequent(np.arange(0, 12.01, 0.01), 'Watering Speed', defuzzify_method='centroid')
-
-# Define fuzzy membership functions for input variables
-temperature['Very Cold'] = fuzz.trapmf(temperature.universe, [-20, -20, 5, 10])
-temperature['Cold'] = fuzz.trapmf(temperature.universe, [5, 10, 15, 20])
-temperature['Warm'] = fuzz.trapmf(temperature.universe, [15, 20, 25, 30])
-temperature['Hot'] = fuzz.trapmf(temperature.universe, [25, 30, 51, 51])
-
-soil_moisture['Very Dry'] = fuzz.trapmf(soil_moisture.universe, [0, 0, 25, 35])
-soil_moisture['Dry'] = fuzz.trapmf(soil_moisture.universe, [25, 35, 45, 55])
-soil_moisture['Moist'] = fuzz.trapmf(soil_moisture.universe, [45, 55, 65, 75])
-soil_moisture['Very Moist'] = fuzz.trapmf(soil_moisture.universe, [65, 75, 101, 101])
-
-light_intensity['Weak'] = fuzz.trapmf(light_intensity.universe, [0, 0, 300, 400])
-light_intensity['Medium'] = fuzz.trapmf(light_intensity.universe, [300, 400, 700, 800])
-light_intensity['Strong'] = fuzz.trapmf(light_intensity.universe, [700, 800, 1001, 1001])
-
-# Define fuzzy membership functions for output variable
-watering_speed['Very Slow'] = fuzz.trapmf(watering_speed.universe, [0, 0, 2, 3])
-watering_speed['Slow'] = fuzz.trapmf(watering_speed.universe, [2, 3, 5, 6])
-watering_speed['Fast'] = fuzz.trapmf(watering_speed.universe, [5, 6, 8, 9])
-watering_speed['Very Fast'] = fuzz.trapmf(watering_speed.universe, [8, 9, 12, 12])
-# watering_speed.view()
-
-rule1 = ctrl.Rule(temperature['Very Cold'] & soil_moisture['Very Dry'] & light_intensity['Strong'], watering_speed['Very Slow'])
-rule2 = ctrl.Rule(temperature['Cold'] & soil_moisture['Very Dry'] & light_intensity['Weak'], watering_speed['Fast'])
-rule3 = ctrl.Rule(temperature['Cold'] & soil_moisture['Very Dry'] & light_intensity['Medium'], watering_speed['Fast'])
-rule4 = ctrl.Rule(temperature['Cold'] & soil_moisture['Very Dry'] & light_intensity['Strong'], watering_speed['Very Fast'])
-rule5 = ctrl.Rule(temperature['Cold'] & soil_moisture['Dry'] & light_intensity['Weak'], watering_speed['Slow'])
-rule6 = ctrl.Rule(temperature['Cold'] & soil_moisture['Dry'] & light_intensity['Medium'], watering_speed['Slow'])
-rule7 = ctrl.Rule(temperature['Cold'] & soil_moisture['Dry'] & light_intensity['Strong'], watering_speed['Fast'])
-rule8 = ctrl.Rule(temperature['Cold'] & soil_moisture['Moist'] & light_intensity['Medium'], watering_speed['Very Slow'])
-rule9 = ctrl.Rule(temperature['Cold'] & soil_moisture['Moist'] & light_intensity['Strong'], watering_speed['Slow'])
-rule10 = ctrl.Rule(temperature['Warm'] & soil_moisture['Very Dry'] & light_intensity['Weak'], watering_speed['Very Fast'])
-rule11 = ctrl.Rule(temperature['Warm'] & soil_moisture['Very Dry'] & light_intensity['Medium'], watering_speed['Very Fast'])
-rule12 = ctrl.Rule(temperature['Warm'] & soil_moisture['Very Dry'] & light_intensity['Strong'], watering_speed['Very Fast'])
-rule13 = ctrl.Rule(temperature['Warm'] & soil_moisture['Dry'] & light_intensity['Weak'], watering_speed['Fast'])
-rule14 = ctrl.Rule(temperature['Warm'] & soil_moisture['Dry'] & light_intensity['Medium'], watering_speed['Fast'])
-rule15 = ctrl.Rule(temperature['Warm'] & soil_moisture['Dry'] & light_intensity['Strong'], watering_speed['Very Fast'])
-rule16 = ctrl.Rule(temperature['Warm'] & soil_moisture['Moist'] & light_intensity['Weak'], watering_speed['Slow'])
-rule17 = ctrl.Rule(temperature['Warm'] & soil_moisture['Moist'] & light_intensity['Medium'], watering_speed['Slow'])
-rule18 = ctrl.Rule(temperature['Warm'] & soil_moisture['Moist'] & light_intensity['Strong'], watering_speed['Fast'])
-rule19 = ctrl.Rule(temperature['Hot'] & soil_moisture['Very Dry'] & light_intensity['Weak'], watering_speed['Very Fast'])
-rule20 = ctrl.Rule(temperature['Hot'] & soil_moisture['Very Dry'] & light_intensity['Medium'], watering_speed['Very Fast'])
-rule21 = ctrl.Rule(temperature['Hot'] & soil_moisture['Very Dry'] & light_intensity['Strong'], watering_speed['Very Fast'])
-rule22 = ctrl.Rule(temperature['Hot'] & soil_moisture['Dry'] & light_intensity['Weak'], watering_speed['Fast'])
-rule23 = ctrl.Rule(temperature['Hot'] & soil_moisture['Dry'] & light_intensity['Medium'], watering_speed['Fast'])
-rule24 = ctrl.Rule(temperature['Hot'] & soil_moisture['Dry'] & light_intensity['Strong'], watering_speed['Very Fast'])
-rule25 = ctrl.Rule(temperature['Hot'] & soil_moisture['Moist'] & light_intensity['Weak'], watering_speed['Slow'])
-rule26 = ctrl.Rule(temperature['Hot'] & soil_moisture['Moist'] & light_intensity['Medium'], watering_speed['Fast'])
-rule27 = ctrl.Rule(temperature['Hot'] & soil_moisture['Moist'] & light_intensity['Strong'], watering_speed['Fast'])
-
-watering_system = ctrl.ControlSystem([rule1, rule2, rule3, rule4, rule5, rule6, rule7, rule8, rule9, rule10,
-                                     rule11, rule12, rule13, rule14, rule15, rule16, rule17, rule18, rule19, rule20,
-                                     rule21, rule22, rule23, rule24, rule25, rule26, rule27])
-watering = ctrl.ControlSystemSimulation(watering_system)
-
 if submitted == False and st.session_state.page1['is_first_load'] == True:
     st.subheader("Please enter the following parameters:")
     st.markdown(
@@ -175,45 +116,64 @@ if submitted == False and st.session_state.page1['is_first_load'] == True:
     """, unsafe_allow_html=True)
     
 if submitted == True or st.session_state.page1['is_first_load'] == False:
-    watering.input['Temperature'] = temperature_input
-    watering.input['Soil Moisture'] = soil_moisture_input
-    watering.input['Light Intensity'] = light_intensity_input
-
     st.subheader("Results calculated using skfuzzy library:")
     print("skfuzzy:")
 
+    # The skfuzzy control systems are built on the first submit and reused across reruns
+    mom_controller = get_controller('mom')
+    centroid_controller = get_controller('centroid')
+    # Stage timings of this run, shown in the performance expander
+    run_tracer = RingBufferTracer()
+
     try:
-        watering.compute()
-
-        watering_speed.defuzzify_method = 'mom'
-        watering = ctrl.ControlSystemSimulation(watering_system)
-        watering.input['Temperature'] = temperature_input
-        watering.input['Soil Moisture'] = soil_moisture_input
-        watering.input['Light Intensity'] = light_intensity_input
-        watering.compute()
-        print(f"Mean of Maximum ({watering_speed.defuzzify_method})", end = ": ")
-        print(round(watering.output['Watering Speed'], 2))
+        # Centroid first, like the original page: it raises ValueError when no
+        # rule fires, while skfuzzy's MOM would still return 6 for an empty
+        # output set. Nothing is shown until both results are in.
+        with centroid_controller.lock:
+            with stage_timer(run_tracer, 'compute_centroid'):
+                centroid_output = centroid_controller.compute(temperature_input, soil_moisture_input, light_intensity_input)
+            with stage_timer(run_tracer, 'plot_centroid'):
+                if charts == "Interactive":
+                    chart2 = vega_lite_spec(WATERING_SPEED, centroid_controller.output_memberships(), centroid_output)
+                else:
+                    image2 = RENDER_CACHE.get(('skfuzzy', 'centroid', temperature_input, soil_moisture_input, light_intensity_input),
+                                             centroid_controller.figure)
+        with mom_controller.lock:
+            with stage_timer(run_tracer, 'compute_mom'):
+                mom_output = mom_controller.compute(temperature_input, soil_moisture_input, light_intensity_input)
+            with stage_timer(run_tracer, 'plot_mom'):
+                if charts == "Interactive":
+                    chart1 = vega_lite_spec(WATERING_SPEED, mom_controller.output_memberships(), mom_output)
+                else:
+                    image1 = RENDER_CACHE.get(('skfuzzy', 'mom', temperature_input, soil_moisture_input, light_intensity_input),
+                                             mom_controller.figure)
+
+        print("Mean of Maximum (mom)", end = ": ")
+        print(round(mom_output, 2))
         st.markdown("<p class='text'>Using the Mean of Maximum method, the determined output is:</p>", unsafe_allow_html=True)
-        st.markdown(f"<p class='text center'>{'{:.2f}'.format(round(watering.output['Watering Speed'], 2))} liters/minute ~ <b>{'{:.10f}'.format(round(watering.output['Watering Speed'], 2) / 60000)} m3/s</b></p>", unsafe_allow_html=True)
-        fig1 = watering_speed.get_fig(sim=watering)
-        st.write(fig1)
-
-        watering_speed.defuzzify_method = 'centroid'
-        watering = ctrl.ControlSystemSimulation(watering_system)
-        watering.input['Temperature'] = temperature_input
-        watering.input['Soil Moisture'] = soil_moisture_input
-        watering.input['Light Intensity'] = light_intensity_input
-        watering.compute()
-        print(f"Centroid ({watering_speed.defuzzify_method})", end = ": ")
-        print(round(watering.output['Watering Speed'], 2))
+        st.markdown(f"<p class='text center'>{'{:.2f}'.format(round(mom_output, 2))} liters/minute ~ <b>{'{:.10f}'.format(round(mom_output, 2) / 60000)} m3/s</b></p>", unsafe_allow_html=True)
+        if charts == "Interactive":
+            st.vega_lite_chart(chart1, use_container_width=True)
+        else:
+            st.image(image1, use_column_width=True)
+
+        print("Centroid (centroid)", end = ": ")
+        print(round(centroid_output, 2))
         st.markdown("<p class='text'>Using the centroid method, the determined output is:</p>", unsafe_allow_html=True)
-        st.markdown(f"<p class='text center'>{'{:.2f}'.format(round(watering.output['Watering Speed'], 2))} liters/minute ~ <b>{'{:.10f}'.format(round(watering.output['Watering Speed'], 2) / 60000)} m3/s</b></p>", unsafe_allow_html=True)
-        fig2 = watering_speed.get_fig(sim=watering)
-        st.write(fig2)
-      
+        st.markdown(f"<p class='text center'>{'{:.2f}'.format(round(centroid_output, 2))} liters/minute ~ <b>{'{:.10f}'.format(round(centroid_output, 2) / 60000)} m3/s</b></p>", unsafe_allow_html=True)
+        if charts == "Interactive":
+            st.vega_lite_chart(chart2, use_container_width=True)
+        else:
+            st.image(image2, use_column_width=True)
+
     except ValueError:
         st.markdown(f"<p class='text'>Based on the fuzzy values computed, and applying the defined rules, the conclusion is:</p>", unsafe_allow_html=True)
         st.markdown("<p class='text center'><b>It is not advisable to water the plant in this condition</b></p>", unsafe_allow_html=True)
         print("Crisp output cannot be calculated!")
+
+    with st.expander("Performance"):
+        for stage, (total, count) in run_tracer.timings().items():
+            st.markdown(f"{stage}: {total * 1000:.2f} ms")
+        st.markdown(f"Plot cache: {RENDER_CACHE.hits} hits, {RENDER_CACHE.misses} misses")
     submitted = False
     print("___________________________________________")
\ No newline at end of file
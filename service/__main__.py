@@ -0,0 +1,31 @@
+"""Run the inference service: python -m service [--host HOST] [--port PORT]"""
+import argparse
+import functools
+
+from algorithm.fuzzy_logic import FuzzyLogic
+from algorithm.tracing import MetricsTracer
+from service.app import InferenceApp
+from service.batching import MicroBatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless FuzzyLogic inference service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-rows', type=int, default=8192,
+                        help="readings evaluated together at most")
+    parser.add_argument('--max-delay', type=float, default=0.002,
+                        help="seconds a request may wait for others to join its batch")
+    args = parser.parse_args()
+
+    # uvicorn is only needed to serve; the app itself is plain ASGI
+    import uvicorn
+    metrics = MetricsTracer()
+    evaluate = functools.partial(FuzzyLogic.evaluate_batch, tracer=metrics)
+    app = InferenceApp(MicroBatcher(max_batch_rows=args.max_batch_rows, max_delay=args.max_delay, evaluate=evaluate),
+                       metrics)
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
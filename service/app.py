@@ -0,0 +1,188 @@
+import functools
+import json
+
+import numpy as np
+
+from algorithm.fuzzy_logic import FuzzyLogic
+from algorithm.tracing import MetricsTracer, stage_timer
+from service.batching import MicroBatcher
+
+INPUTS = ('temperature', 'soil_moisture', 'light_intensity')
+MEMBERSHIPS = ('temperature', 'soil_moisture', 'light_intensity', 'watering_speed')
+RULE_KEYS = list(FuzzyLogic.RULES_SET)
+RULE_INDICES = np.array([[int(i) for i in key] for key in RULE_KEYS]).T
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _numbers(value):
+    # np.asarray(..., dtype=float) would take null as NaN and "12" or true as numbers
+    try:
+        array = np.asarray(value)
+    except ValueError:
+        raise BadRequest("Readings must be numbers or equal-length lists of numbers")
+    if array.dtype.kind not in 'iuf' and array.size:
+        raise BadRequest("Readings must be numbers")
+    array = array.astype(float)
+    if not np.isfinite(array).all():
+        raise BadRequest("Readings must be finite")
+    return array
+
+
+def parse_json_readings(body):
+    """Readings from a JSON body, and whether it held a single reading.
+
+    Accepted: {"temperature": t, "soil_moisture": m, "light_intensity": l} with
+    finite numbers or equal-length lists of them, or {"readings": [[t, m, l], ...]}.
+    """
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise BadRequest("Body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise BadRequest("Body must be a JSON object")
+    if 'readings' in payload:
+        readings = _numbers(payload['readings'])
+        if readings.shape == (0,):
+            readings = readings.reshape(0, 3)
+        if readings.ndim != 2 or readings.shape[1] != 3:
+            raise BadRequest("readings must be a list of [temperature, soil_moisture, light_intensity] triples")
+        return readings[:, 0], readings[:, 1], readings[:, 2], False
+    missing = [name for name in INPUTS if name not in payload]
+    if missing:
+        raise BadRequest("Missing field {}".format(', '.join(missing)))
+    columns = [_numbers(payload[name]) for name in INPUTS]
+    single = all(column.ndim == 0 for column in columns)
+    if not single and not (all(column.ndim == 1 for column in columns)
+                           and columns[0].shape == columns[1].shape == columns[2].shape):
+        raise BadRequest("{} must all be numbers or all be lists of the same length".format(', '.join(INPUTS)))
+    return columns[0], columns[1], columns[2], single
+
+
+def parse_binary_readings(body):
+    """Readings from little-endian float64 triples (temperature, soil moisture, light)."""
+    if len(body) % 24 != 0:
+        raise BadRequest("Binary body must be a whole number of float64 triples")
+    readings = np.frombuffer(body, dtype='<f8').reshape(-1, 3)
+    if not np.isfinite(readings).all():
+        raise BadRequest("Readings must be finite")
+    return readings[:, 0], readings[:, 1], readings[:, 2]
+
+
+def fired_rules(result):
+    """RULES_SET keys with a non-zero firing strength, per reading."""
+    a, b, c = RULE_INDICES
+    strength = np.minimum(np.minimum(result['membership_values_of_temperature'][:, a],
+                                     result['membership_values_of_soil_moisture'][:, b]),
+                          result['membership_values_of_light_intensity'][:, c])
+    return [[RULE_KEYS[j] for j in np.nonzero(row > 0)[0]] for row in strength]
+
+
+def to_json(result, single):
+    response = {
+        'watering_speed_l_min': result['crisp_value'].tolist(),
+        'watering_speed_m3_s': result['output'].tolist(),
+        'rule_fired': result['rule_fired'].tolist(),
+        'fired_rules': fired_rules(result),
+        'membership_values': {name: result['membership_values_of_' + name].tolist() for name in MEMBERSHIPS}
+    }
+    if single:
+        response = {key: value[0] for key, value in response.items() if key != 'membership_values'}
+        response['membership_values'] = {name: result['membership_values_of_' + name][0].tolist()
+                                         for name in MEMBERSHIPS}
+    return response
+
+
+class InferenceApp(object):
+    """ASGI application serving FuzzyLogic over HTTP.
+
+    POST /evaluate takes readings as JSON (see parse_json_readings) or as
+    application/octet-stream float64 triples, and answers with JSON. Send
+    `Accept: application/octet-stream` to get float64 (L/min, m3/s) pairs
+    back instead. GET /health answers 200. Concurrent requests are evaluated
+    together through a MicroBatcher.
+
+    GET /metrics serves `metrics` (a MetricsTracer) in Prometheus text format:
+    request latency, and the batch stage timings and rule counters when the
+    batcher evaluates through it, as the default one does.
+    """
+
+    def __init__(self, batcher=None, metrics=None):
+        self.metrics = metrics if metrics is not None else MetricsTracer()
+        if batcher is None:
+            batcher = MicroBatcher(evaluate=functools.partial(FuzzyLogic.evaluate_batch, tracer=self.metrics))
+        self.batcher = batcher
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope['headers']}
+        if scope['path'] == '/health':
+            await self.respond(send, 200, b'{"status": "ok"}')
+        elif scope['path'] == '/metrics':
+            await self.respond(send, 200, self.metrics.prometheus().encode('utf-8'), 'text/plain; version=0.0.4')
+        elif scope['path'] != '/evaluate':
+            await self.respond(send, 404, b'{"error": "Not found"}')
+        elif scope['method'] != 'POST':
+            await self.respond(send, 405, b'{"error": "Use POST"}')
+        else:
+            body = await self.read_body(receive)
+            with stage_timer(self.metrics, 'http_evaluate'):
+                try:
+                    status, payload, content_type = await self.evaluate(body, headers)
+                except BadRequest as error:
+                    status, payload, content_type = 400, json.dumps({'error': str(error)}).encode('utf-8'), 'application/json'
+            await self.respond(send, status, payload, content_type)
+
+    async def evaluate(self, body, headers):
+        if headers.get('content-type', '').startswith('application/octet-stream'):
+            temperatures, soil_moistures, light_intensities = parse_binary_readings(body)
+            single = False
+        else:
+            temperatures, soil_moistures, light_intensities, single = parse_json_readings(body)
+        try:
+            result = await self.batcher.submit(temperatures, soil_moistures, light_intensities)
+        except ValueError as error:
+            raise BadRequest(str(error))
+        if headers.get('accept', '').startswith('application/octet-stream'):
+            speeds = np.stack([result['crisp_value'], result['output']], axis=1).astype('<f8')
+            return 200, speeds.tobytes(), 'application/octet-stream'
+        return 200, json.dumps(to_json(result, single)).encode('utf-8'), 'application/json'
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.batcher.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.batcher.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    @staticmethod
+    async def respond(send, status, payload, content_type='application/json'):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type.encode('latin-1')),
+                        (b'content-length', str(len(payload)).encode('latin-1'))]
+        })
+        await send({'type': 'http.response.body', 'body': payload})
+
+
+app = InferenceApp()
@@ -0,0 +1,99 @@
+import asyncio
+
+import numpy as np
+
+from algorithm.fuzzy_logic import FuzzyLogic
+
+
+class MicroBatcher(object):
+    """Coalesce concurrent small evaluations into one FuzzyLogic.evaluate_batch call.
+
+    submit() queues a group of readings and waits for its slice of the batch
+    result. A background task takes the first queued group, keeps collecting
+    more for up to `max_delay` seconds or until `max_batch_rows` readings, and
+    evaluates them together in a worker thread. At most `max_pending` groups
+    wait in the queue; further submit() calls block until there is room.
+    """
+
+    def __init__(self, max_batch_rows=8192, max_delay=0.002, max_pending=1024, evaluate=None):
+        self.max_batch_rows = max_batch_rows
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.evaluate = evaluate if evaluate is not None else FuzzyLogic.evaluate_batch
+        self.queue = None
+        self.task = None
+
+    def start(self):
+        # The queue belongs to the running event loop, so it is created lazily
+        if self.task is None:
+            self.queue = asyncio.Queue(maxsize=self.max_pending)
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def submit(self, temperatures, soil_moistures, light_intensities):
+        """Evaluate the readings as part of the next batch; returns evaluate_batch's dict."""
+        return await (await self.enqueue(temperatures, soil_moistures, light_intensities))
+
+    async def enqueue(self, temperatures, soil_moistures, light_intensities):
+        """Queue the readings, waiting while the queue is full, and return the future of their result.
+
+        Lets a caller keep several groups in flight instead of waiting for each.
+        """
+        self.start()
+        readings = [np.asarray(values, dtype=float).ravel()
+                    for values in (temperatures, soil_moistures, light_intensities)]
+        if not (readings[0].shape == readings[1].shape == readings[2].shape):
+            raise ValueError("temperatures, soil_moistures and light_intensities must have the same length")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((readings, future))
+        return future
+
+    def depth(self):
+        """Groups waiting in the queue."""
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        rows = batch[0][0][0].shape[0]
+        deadline = asyncio.get_running_loop().time() + self.max_delay
+        while rows < self.max_batch_rows:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if self.queue.empty():
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self.queue.get_nowait()
+            batch.append(item)
+            rows += item[0][0].shape[0]
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            columns = [np.concatenate([readings[i] for readings, future in batch]) for i in range(3)]
+            try:
+                result = await loop.run_in_executor(None, self.evaluate, *columns)
+            except Exception as error:
+                for readings, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            start = 0
+            for readings, future in batch:
+                stop = start + readings[0].shape[0]
+                if not future.done():
+                    future.set_result({key: value[start:stop] for key, value in result.items()})
+                start = stop
@@ -0,0 +1,77 @@
+"""Simulated sensor devices streaming readings to a running gateway.
+
+    python -m service.gateway &
+    python -m service.device_feed --devices 100 --readings 1000 --rate 200
+
+A local stand-in for the broker: every device is one connection writing
+newline-JSON readings and reading back its watering commands, which arrive
+in order. Reports the latency from a reading sent to its command received.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+
+async def device(host, port, zone, readings, rate, rng, latencies, commands):
+    reader, writer = await asyncio.open_connection(host, port)
+    sent = []
+
+    async def receive():
+        for i in range(readings):
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("Gateway closed the connection")
+            latencies.append(time.perf_counter() - sent[i])
+            commands.append(json.loads(line))
+
+    receiver = asyncio.get_running_loop().create_task(receive())
+    try:
+        values = rng.uniform([-20, 0, 0], [50, 100, 1000], (readings, 3)).tolist()
+        for temperature, soil_moisture, light_intensity in values:
+            line = json.dumps({'zone': zone, 'temperature': temperature, 'soil_moisture': soil_moisture,
+                               'light_intensity': light_intensity}).encode('utf-8') + b'\n'
+            sent.append(time.perf_counter())
+            writer.write(line)
+            # Blocks while the gateway is not reading this connection
+            await writer.drain()
+            if rate:
+                await asyncio.sleep(1 / rate)
+        await receiver
+    finally:
+        receiver.cancel()
+        writer.close()
+
+
+async def run(host, port, devices, readings, rate, seed):
+    latencies, commands = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[device(host, port, 'zone-{}'.format(i), readings, rate,
+                                  np.random.default_rng(seed + i), latencies, commands)
+                           for i in range(devices)])
+    return np.array(latencies), commands, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--devices', type=int, default=100, help="parallel device connections")
+    parser.add_argument('--readings', type=int, default=1000, help="readings per device")
+    parser.add_argument('--rate', type=float, default=0, help="readings per second per device, 0 for as fast as possible")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    latencies, commands, elapsed = asyncio.run(run(args.host, args.port, args.devices, args.readings,
+                                                   args.rate, args.seed))
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    watered = sum(1 for command in commands if command.get('water'))
+    print("{} readings in {:.2f} s ({:.0f} readings/s), {} watering commands".format(
+        latencies.shape[0], elapsed, latencies.shape[0] / elapsed, watered))
+    print("latency p50 {:.2f} ms, p99 {:.2f} ms, max {:.2f} ms".format(p50, p99, latencies.max() * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""Ingest live sensor readings over TCP and answer with watering commands.
+
+    python -m service.gateway --port 9000 --metrics-port 9100
+    python -m service.device_feed --port 9000 --devices 100
+
+Devices send one JSON reading per line,
+
+    {"zone": "bed-4", "temperature": 24.1, "soil_moisture": 38.5, "light_intensity": 610}
+
+and get one command per line back on the same connection, in order:
+
+    {"zone": "bed-4", "water": true, "watering_speed_l_min": 7.0, "watering_speed_m3_s": 0.000116...}
+
+Readings from all connections are evaluated together by a MicroBatcher.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import math
+import time
+
+from algorithm.fuzzy_logic import FuzzyLogic
+from algorithm.tracing import MetricsTracer
+from service.app import INPUTS
+from service.batching import MicroBatcher
+
+
+class BadReading(Exception):
+    pass
+
+
+def parse_reading(line):
+    """(zone, temperature, soil_moisture, light_intensity) from one JSON line."""
+    try:
+        payload = json.loads(line)
+    except ValueError:
+        raise BadReading("Line is not valid JSON")
+    if not isinstance(payload, dict):
+        raise BadReading("A reading must be a JSON object")
+    missing = [name for name in INPUTS if name not in payload]
+    if missing:
+        raise BadReading("Missing field {}".format(', '.join(missing)))
+    values = [payload[name] for name in INPUTS]
+    # float() would also take "nan", "12" or true; FuzzyLogic reads NaN as the last term
+    if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        raise BadReading("Readings must be JSON numbers")
+    values = [float(value) for value in values]
+    if not all(math.isfinite(value) for value in values):
+        raise BadReading("Readings must be finite")
+    return (payload.get('zone'),) + tuple(values)
+
+
+def command(zone, result, row=0):
+    """Watering command for one reading of an evaluate_batch result; no rule fired means no water."""
+    water = bool(result['rule_fired'][row])
+    return {
+        'zone': zone,
+        'water': water,
+        'watering_speed_l_min': float(result['crisp_value'][row]) if water else 0.,
+        'watering_speed_m3_s': float(result['output'][row]) if water else 0.
+    }
+
+
+class IngestionGateway(object):
+    """asyncio TCP server turning newline-JSON readings into watering commands.
+
+    The complete lines of each read from a connection (up to `read_bytes`)
+    go to the shared MicroBatcher as one group, and every connection keeps
+    up to `max_in_flight` groups waiting for results; commands are written
+    back in arrival order and passed to `publish` (a coroutine function
+    taking the command dict) when given. When the batcher queue or a
+    connection's in-flight window is full the gateway stops reading that
+    socket, so TCP pushes back on the device instead of memory growing.
+    A line longer than `max_line_bytes`, or a failure to evaluate, publish
+    or write a group, closes the connection.
+
+    `metrics` (a MetricsTracer) gets the batch stages, end-to-end latency
+    from line received to command written, queue depth, readings in flight
+    and rejected lines.
+    """
+
+    def __init__(self, batcher=None, metrics=None, publish=None, max_in_flight=64, read_bytes=65536,
+                 max_line_bytes=4096):
+        self.metrics = metrics if metrics is not None else MetricsTracer()
+        if batcher is None:
+            batcher = MicroBatcher(evaluate=functools.partial(FuzzyLogic.evaluate_batch, tracer=self.metrics))
+        self.batcher = batcher
+        self.publish = publish
+        self.max_in_flight = max_in_flight
+        self.read_bytes = read_bytes
+        self.max_line_bytes = max_line_bytes
+        self.in_flight = 0
+        self.connections = 0
+
+    async def start(self, host='127.0.0.1', port=9000):
+        """Start listening; returns the asyncio server."""
+        self.batcher.start()
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def stop(self, server):
+        server.close()
+        await server.wait_closed()
+        await self.batcher.stop()
+
+    async def handle(self, reader, writer):
+        pending = asyncio.Queue(maxsize=self.max_in_flight)
+        sender = asyncio.get_running_loop().create_task(self._send(pending, writer))
+        self.connections += 1
+        self._update_gauges()
+        partial = b''
+        try:
+            while not sender.done():
+                try:
+                    chunk = await reader.read(self.read_bytes)
+                except ConnectionError:
+                    break
+                if not chunk:
+                    break
+                received = time.perf_counter()
+                *lines, partial = (partial + chunk).split(b'\n')
+                if len(partial) > self.max_line_bytes:
+                    # Not a sensor reading; stop listening to this device
+                    break
+                # Every complete line of one read goes to the batcher as one group
+                zones, readings = [], []
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        zone, *values = parse_reading(line)
+                    except BadReading as error:
+                        zones.append(error)
+                    else:
+                        zones.append(zone)
+                        readings.append(values)
+                if not zones:
+                    continue
+                future = None
+                if readings:
+                    future = await self.batcher.enqueue(*zip(*readings))
+                self.in_flight += len(zones)
+                if not await self._put(pending, (zones, received, future), sender):
+                    self.in_flight -= len(zones)
+                    break
+                self._update_gauges()
+        finally:
+            if not sender.done():
+                # Let the sender answer what is queued, then stop
+                await self._put(pending, None, sender)
+            await asyncio.gather(sender, return_exceptions=True)
+            # Groups left behind by a sender that failed are never answered
+            while not pending.empty():
+                item = pending.get_nowait()
+                if item is not None:
+                    zones, received, future = item
+                    self.in_flight -= len(zones)
+                    if future is not None:
+                        future.cancel()
+            self.connections -= 1
+            self._update_gauges()
+            writer.close()
+
+    @staticmethod
+    async def _put(pending, item, sender):
+        """Queue item for the sender, waiting for room; False if the sender stopped first."""
+        put = asyncio.ensure_future(pending.put(item))
+        await asyncio.wait({put, sender}, return_when=asyncio.FIRST_COMPLETED)
+        if put.done():
+            return True
+        put.cancel()
+        return False
+
+    async def _send(self, pending, writer):
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            zones, received, future = item
+            try:
+                await self._answer(zones, received, future, writer)
+            except Exception:
+                # Drop the connection, which also ends the read in handle()
+                writer.close()
+                raise
+            finally:
+                # Also when publishing or writing failed and the connection is dropped
+                self.in_flight -= len(zones)
+                self._update_gauges()
+
+    async def _answer(self, zones, received, future, writer):
+        """Write the commands of one group; the other exceptions of `future` and `publish` propagate."""
+        result, error = None, None
+        if future is not None:
+            try:
+                result = await future
+            except ValueError as exception:
+                error = str(exception)
+        responses, row = [], 0
+        for zone in zones:
+            if isinstance(zone, BadReading):
+                responses.append({'zone': None, 'error': str(zone)})
+                self.metrics.increment('gateway_rejected_readings',
+                                       description="Lines that were not a valid reading.")
+                continue
+            if error is not None:
+                response = {'zone': zone, 'error': error}
+            else:
+                response = command(zone, result, row)
+                if self.publish is not None:
+                    await self.publish(response)
+            responses.append(response)
+            row += 1
+        writer.write(b''.join(json.dumps(response).encode('utf-8') + b'\n' for response in responses))
+        await writer.drain()
+        self.metrics.record('gateway_end_to_end', time.perf_counter() - received, rows=len(zones))
+
+    def _update_gauges(self):
+        self.metrics.set_gauge('gateway_queue_depth', self.batcher.depth(), "Reading groups waiting for a batch.")
+        self.metrics.set_gauge('gateway_in_flight', self.in_flight, "Readings received and not yet answered.")
+        self.metrics.set_gauge('gateway_connections', self.connections, "Open device connections.")
+
+
+async def serve_metrics(metrics, host='127.0.0.1', port=9100):
+    """Minimal HTTP server answering every request with the metrics in Prometheus text format."""
+    async def handle(reader, writer):
+        try:
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            body = metrics.prometheus().encode('utf-8')
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                         + 'Content-Length: {}\r\nConnection: close\r\n\r\n'.format(len(body)).encode('latin-1')
+                         + body)
+            await writer.drain()
+        finally:
+            writer.close()
+    return await asyncio.start_server(handle, host, port)
+
+
+async def run(args):
+    metrics = MetricsTracer()
+    evaluate = functools.partial(FuzzyLogic.evaluate_batch, tracer=metrics)
+    batcher = MicroBatcher(max_batch_rows=args.max_batch_rows, max_delay=args.max_delay,
+                           max_pending=args.max_pending, evaluate=evaluate)
+    gateway = IngestionGateway(batcher, metrics, max_in_flight=args.max_in_flight)
+    server = await gateway.start(args.host, args.port)
+    metrics_server = await serve_metrics(gateway.metrics, args.host, args.metrics_port) if args.metrics_port else None
+    try:
+        await server.serve_forever()
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        await gateway.stop(server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Newline-JSON sensor ingestion gateway")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--metrics-port', type=int, default=9100, help="0 disables the metrics endpoint")
+    parser.add_argument('--max-batch-rows', type=int, default=8192, help="readings evaluated together at most")
+    parser.add_argument('--max-delay', type=float, default=0.002,
+                        help="seconds a reading may wait for others to join its batch")
+    parser.add_argument('--max-pending', type=int, default=1024, help="reading groups queued for batching at most")
+    parser.add_argument('--max-in-flight', type=int, default=64, help="unanswered reads per connection")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Load-test a running inference service and report latency percentiles.
+
+    python -m service &
+    python -m service.load_test --concurrency 64 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+
+async def client(host, port, requests, rng, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            body = json.dumps({'temperature': rng.uniform(-20, 50),
+                               'soil_moisture': rng.uniform(0, 100),
+                               'light_intensity': rng.uniform(0, 1000)}).encode('utf-8')
+            request = ("POST /evaluate HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\n"
+                       "Content-Length: {}\r\n\r\n").format(host, len(body)).encode('latin-1') + body
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            length = None
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run(host, port, concurrency, requests, seed):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(host, port, requests, np.random.default_rng(seed + i), latencies)
+                           for i in range(concurrency)])
+    return np.array(latencies), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--concurrency', type=int, default=32, help="parallel keep-alive connections")
+    parser.add_argument('--requests', type=int, default=100, help="requests per connection")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    latencies, elapsed = asyncio.run(run(args.host, args.port, args.concurrency, args.requests, args.seed))
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print("{} requests in {:.2f} s ({:.0f} req/s)".format(latencies.shape[0], elapsed, latencies.shape[0] / elapsed))
+    print("latency p50 {:.2f} ms, p99 {:.2f} ms, max {:.2f} ms".format(p50, p99, latencies.max() * 1000))
+
+
+if __name__ == '__main__':
+    main()